@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Render off-screen so the suite runs on CI machines without a display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+from game.camera import ZOOM_LEVELS
+from game.city import DEFAULT_VIEWPORT, City
+from game.math_solver import MathSolver
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def measure(fn: Callable[[], int], repeat: int = 3) -> Dict[str, float]:
+    # fn runs the workload once and returns how many operations it did; the
+    # fastest of `repeat` runs is reported
+    best = None
+    ops = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": best, "ops": ops, "seconds_per_op": best / max(1, ops)}
+
+def filled_city(grid_width: int, grid_height: int, density: float, seed: int = 0) -> City:
+    # Cover roughly `density` of the grid with factories at random anchors
+    city = City(*DEFAULT_VIEWPORT, grid_width, grid_height)
+    rng = random.Random(seed)
+    target = int(grid_width * grid_height * density)
+    covered = 0
+    attempts = 0
+    while covered + 9 <= target and attempts < target:
+        attempts += 1
+        if city.place_building("factory", rng.randrange(grid_width), rng.randrange(grid_height)):
+            covered += 9
+    return city
+
+def bench_placement(results: Dict[str, Dict[str, float]], grids: List[tuple], densities: List[float]):
+    for grid_width, grid_height in grids:
+        for density in densities:
+            city = filled_city(grid_width, grid_height, density)
+            name = f"{grid_width}x{grid_height}@{density:g}"
+            rng = random.Random(1)
+            anchors = [(rng.randrange(grid_width), rng.randrange(grid_height)) for _ in range(20000)]
+
+            def check():
+                for x, y in anchors:
+                    city._can_place_building("shop", x, y)
+                return len(anchors)
+            results[f"can_place/{name}"] = measure(check)
+
+            def valid_mask():
+                for building_type in city.building_types:
+                    city.valid_placements(building_type)
+                return len(city.building_types)
+            results[f"valid_placements/{name}"] = measure(valid_mask)
+
+            # Placing mutates the city, so it gets one timed run on a fresh copy
+            target = filled_city(grid_width, grid_height, density)
+
+            def place():
+                for x, y in anchors[:5000]:
+                    target.place_building("house", x, y)
+                return 5000
+            results[f"place/{name}"] = measure(place, repeat=1)
+
+def bench_draw(results: Dict[str, Dict[str, float]], counts: List[int]):
+    width, height, _ = DEFAULT_VIEWPORT
+    screen = pygame.Surface((width + 300, height))
+    building_types = City(*DEFAULT_VIEWPORT).building_types
+    for count in counts:
+        for building_type, properties in building_types.items():
+            size = properties["size"]
+            per_row = max(1, int(count ** 0.5))
+            grid_width = per_row * size
+            grid_height = -(-count // per_row) * size
+            city = City(*DEFAULT_VIEWPORT, grid_width, grid_height)
+            for i in range(count):
+                city.place_building(building_type, (i % per_row) * size, (i // per_row) * size)
+            name = f"{building_type}x{count}"
+
+            def cold():
+                city.invalidate()
+                city.sprites.clear()
+                city.draw(screen)
+                return 1
+            results[f"draw_cold/{name}"] = measure(cold)
+
+            def warm():
+                for _ in range(60):
+                    city.draw(screen)
+                return 60
+            results[f"draw_warm/{name}"] = measure(warm)
+
+            def zoomed_out():
+                # Widest zoom shows the most chunks at once
+                zoom_index = city.camera.zoom_index
+                city.camera.zoom_by(-len(ZOOM_LEVELS), (0, 0))
+                for _ in range(60):
+                    city.draw(screen)
+                city.camera.zoom_by(zoom_index - city.camera.zoom_index, (0, 0))
+                return 60
+            results[f"draw_zoomed_out/{name}"] = measure(zoomed_out)
+
+def bench_math(results: Dict[str, Dict[str, float]], n: int):
+    solver = MathSolver()
+    random.seed(0)
+    for building_type in solver.problem_types:
+        def single():
+            for _ in range(n):
+                solver.generate_problem(building_type)
+            return n
+        results[f"generate_problem/{building_type}"] = measure(single)
+
+        rng = np.random.default_rng(0)
+        results[f"generate_batch/{building_type}"] = measure(lambda: len(solver.generate_batch(building_type, n, rng)))
+
+    problems = solver.generate_batch("factory", n, np.random.default_rng(1))
+
+    def check_numeric():
+        for problem in problems:
+            solver.check_answer(problem, problem["answer"])
+        return len(problems)
+    results["check_answer/numeric"] = measure(check_numeric)
+
+    # Non-numeric input takes the SymPy path
+    expressions = problems[:max(1, n // 100)]
+
+    def check_symbolic():
+        for problem in expressions:
+            solver.check_answer(problem, f"{problem['answer']}*1")
+        return len(expressions)
+    results["check_answer/symbolic"] = measure(check_symbolic)
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    regressions = []
+    print(f"{'benchmark':<42} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]["seconds_per_op"]
+        now = result["seconds_per_op"]
+        ratio = now / before if before else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<42} {before * 1e6:10.2f}us {now * 1e6:10.2f}us {ratio:7.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Math City Builder benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small grids and counts only")
+    parser.add_argument("--only", choices=["placement", "draw", "math"], action="append",
+                        help="run just these groups (repeatable)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with these results")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown per op before a result counts as a regression")
+    args = parser.parse_args()
+
+    pygame.init()
+    groups = args.only or ["placement", "draw", "math"]
+    if args.quick:
+        grids = [(28, 19), (200, 200)]
+        densities = [0.0, 0.5]
+        counts = [100]
+        problems = 2000
+    else:
+        grids = [(28, 19), (200, 200), (1000, 1000), (2000, 2000)]
+        densities = [0.0, 0.25, 0.5]
+        counts = [100, 1000, 10000]
+        problems = 20000
+
+    results: Dict[str, Dict[str, float]] = {}
+    if "placement" in groups:
+        bench_placement(results, grids, densities)
+    if "draw" in groups:
+        bench_draw(results, counts)
+    if "math" in groups:
+        bench_math(results, problems)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "quick": args.quick
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+    else:
+        for name, result in sorted(results.items()):
+            print(f"{name:<42} {result['seconds_per_op'] * 1e6:10.2f}us/op")
+        # Timings only compare on the same machine, so none is shipped
+        print(f"No baseline at {args.baseline}; record one on this machine with --save-baseline")
+
+    pygame.quit()
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .city import City
+from .savefile import load_city, save_city
+
+# Autosave directory layout: city-<epoch>.sav is the latest snapshot and
+# city-<epoch>.journal lists every change made after it, one RECORD each
+# (op, type code, x, y). Compaction writes snapshot epoch + 1 and starts a
+# fresh journal before deleting the old pair, so a crash at any point leaves
+# a snapshot/journal pair that replays to the last flushed change. The coin
+# balance is journaled now and then as a COINS_RECORD (op, unused, coins) of
+# the same size.
+RECORD = struct.Struct("<BBii")
+COINS_RECORD = struct.Struct("<BBd")
+OP_PLACE = 1
+OP_REMOVE = 2
+OP_COINS = 3
+OPS = {"place": OP_PLACE, "remove": OP_REMOVE}
+
+def _snapshot_path(directory: str, epoch: int) -> str:
+    return os.path.join(directory, f"city-{epoch}.sav")
+
+def _journal_path(directory: str, epoch: int) -> str:
+    return os.path.join(directory, f"city-{epoch}.journal")
+
+def _latest_epoch(directory: str) -> int:
+    epochs = [0]
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            match = re.fullmatch(r"city-(\d+)\.sav", name)
+            if match:
+                epochs.append(int(match.group(1)))
+    return max(epochs)
+
+def apply_change(city: City, op: int, building_type: str, grid_x: int, grid_y: int):
+    # One journal or network change record; removals name any cell of the building
+    if op == OP_PLACE:
+        city.place_building(building_type, grid_x, grid_y)
+    elif op == OP_REMOVE:
+        building = city.get_instance_at(grid_x, grid_y)
+        if building is not None:
+            city.remove_building(building["id"])
+
+def replay_journal(city: City, path: str) -> int:
+    # Apply every complete record; a torn record at the end is ignored and
+    # an unknown building type raises ValueError
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        data = f.read()
+    count = len(data) // RECORD.size
+    for offset in range(0, count * RECORD.size, RECORD.size):
+        if data[offset] == OP_COINS:
+            city.coins = COINS_RECORD.unpack_from(data, offset)[2]
+            continue
+        op, code, grid_x, grid_y = RECORD.unpack_from(data, offset)
+        if not 0 < code < len(city.type_names):
+            raise ValueError(f"{path} has a record with invalid type code {code}")
+        apply_change(city, op, city.type_names[code], grid_x, grid_y)
+    return count
+
+def recover_city(directory: str, width: int, height: int, grid_size: int,
+                 grid_width: Optional[int] = None, grid_height: Optional[int] = None) -> City:
+    # Latest snapshot plus its journal, or an empty city if nothing was saved.
+    # A damaged snapshot or journal raises ValueError
+    epoch = _latest_epoch(directory)
+    snapshot = _snapshot_path(directory, epoch)
+    if os.path.exists(snapshot):
+        # Read into memory: a mapped snapshot could not be deleted by the
+        # next compaction on Windows
+        city = load_city(snapshot, width, height, grid_size, use_mmap=False)
+    else:
+        city = City(width, height, grid_size, grid_width, grid_height)
+    replay_journal(city, _journal_path(directory, epoch))
+    return city
+
+def set_aside_damaged(directory: str) -> str:
+    # Move every snapshot and journal into a fresh damaged-<time> folder, so
+    # starting a new city does not compact them away; returns the folder
+    backup = os.path.join(directory, time.strftime("damaged-%Y%m%d-%H%M%S"))
+    os.makedirs(backup, exist_ok=True)
+    for name in os.listdir(directory):
+        if re.fullmatch(r"city-(\d+)\.(sav|journal)", name):
+            os.replace(os.path.join(directory, name), os.path.join(backup, name))
+    return backup
+
+class Autosave:
+    def __init__(self, city: City, directory: str, snapshot_every: int = 1000):
+        # The game thread only enqueues changes. The writer thread appends them
+        # to the journal, flushes after each batch and mirrors them into a
+        # replica city that snapshots are written from, so neither flushing
+        # nor compaction ever blocks a frame. Write failures are queued for
+        # the game to report (see take_errors) and the next batch retries
+        # with a full snapshot, since the journal may have missed records
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.city: Optional[City] = None
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._epoch = _latest_epoch(directory)
+        self._replica: Optional[City] = None
+        self._journal = None
+        self._since_snapshot = 0
+        self._snapshot_due = False
+        self._errors: "queue.SimpleQueue[OSError]" = queue.SimpleQueue()
+
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+        self.attach(city)
+
+    def attach(self, city: City):
+        # Follow a different city (e.g. after loading a save); its current
+        # state becomes the next snapshot
+        if self.city is not None:
+            self.city.listeners.remove(self._on_change)
+        self.city = city
+        city.listeners.append(self._on_change)
+        self._queue.put(("reset", {
+            "size": (city.width, city.height, city.grid_size, city.grid_width, city.grid_height),
+            "type_grid": city.type_grid.copy(),
+            "id_grid": city.id_grid.copy(),
+            "buildings": {building_id: dict(building) for building_id, building in city.buildings.items()},
+            "next_building_id": city._next_building_id,
+            "coins": city.coins
+        }))
+
+    def save_coins(self):
+        # The balance changes every tick, so the game journals it
+        # periodically rather than on every change
+        if self.city is not None:
+            self._queue.put(("coins", self.city.coins))
+
+    def close(self):
+        if self.city is not None:
+            self.city.listeners.remove(self._on_change)
+            self.city = None
+        self._queue.put(("close", None))
+        self._thread.join()
+
+    def take_errors(self) -> List[OSError]:
+        errors = []
+        while True:
+            try:
+                errors.append(self._errors.get_nowait())
+            except queue.Empty:
+                return errors
+
+    def _on_change(self, op: str, building: Dict[str, Any]):
+        self._queue.put((op, (building["type"], building["x"], building["y"])))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # The replica takes every change even if writing fails below
+            records = []
+            closing = False
+            for op, payload in batch:
+                if op == "close":
+                    closing = True
+                elif op == "reset":
+                    self._reset_replica(payload)
+                    self._snapshot_due = True
+                elif op == "coins":
+                    self._replica.coins = payload
+                    records.append(COINS_RECORD.pack(OP_COINS, 0, payload))
+                    self._since_snapshot += 1
+                else:
+                    building_type, grid_x, grid_y = payload
+                    apply_change(self._replica, OPS[op], building_type, grid_x, grid_y)
+                    records.append(RECORD.pack(OPS[op], self._replica.type_codes[building_type],
+                                               grid_x, grid_y))
+                    self._since_snapshot += 1
+
+            try:
+                # A snapshot already includes this batch's changes
+                if self._snapshot_due or self._since_snapshot >= self.snapshot_every:
+                    self._compact()
+                elif records:
+                    self._journal.write(b"".join(records))
+                    self._journal.flush()
+                    os.fsync(self._journal.fileno())
+                if closing:
+                    self._close_journal()
+            except OSError as error:
+                self._snapshot_due = True
+                self._errors.put(error)
+            if closing:
+                return
+
+    def _reset_replica(self, state: Dict[str, Any]):
+        self._replica = City(*state["size"])
+        self._replica.restore(state["type_grid"], state["id_grid"], state["buildings"],
+                              state["next_building_id"])
+        self._replica.coins = state["coins"]
+
+    def _compact(self):
+        self._epoch += 1
+        save_city(self._replica, _snapshot_path(self.directory, self._epoch))
+        self._close_journal()
+        self._journal = open(_journal_path(self.directory, self._epoch), "ab")
+        self._since_snapshot = 0
+        self._snapshot_due = False
+
+        # The new pair is complete, so older snapshots and journals can go
+        for name in os.listdir(self.directory):
+            match = re.fullmatch(r"city-(\d+)\.(sav|journal)", name)
+            if match and int(match.group(1)) < self._epoch:
+                os.remove(os.path.join(self.directory, name))
+
+    def _close_journal(self):
+        if self._journal is not None:
+            journal, self._journal = self._journal, None
+            try:
+                journal.flush()
+                os.fsync(journal.fileno())
+            finally:
+                journal.close()
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+# Workers never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+from .city import DEFAULT_VIEWPORT, City
+from .core import TICK_RATE, EngineCore
+from .input import ScriptedInput
+from .math_solver import MathSolver
+
+DEFAULT_CONFIG = {
+    "grid_width": 120,
+    "grid_height": 80,
+    "turns": 200,
+    "accuracy": 0.8,
+    "seconds_per_turn": 5.0
+}
+
+# Reused by every game a worker process runs
+_solver: Optional[MathSolver] = None
+
+def run_game(seed: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    # One scripted game: each turn picks a building and a cell, answers the
+    # problem correctly with probability `accuracy`, then lets the economy
+    # run for `seconds_per_turn`. Everything random derives from `seed`, so a
+    # game's result does not depend on which worker ran it
+    global _solver
+    if _solver is None:
+        _solver = MathSolver()
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    rng = random.Random(seed)
+
+    city = City(*DEFAULT_VIEWPORT, config["grid_width"], config["grid_height"])
+    script = ScriptedInput()
+    engine = EngineCore(city, _solver, script)
+    types = list(city.building_types)
+    ticks_per_turn = round(config["seconds_per_turn"] * TICK_RATE)
+    answered = correct = 0
+
+    for _ in range(config["turns"]):
+        script.push("select", rng.choice(types))
+        script.push("click_cell", (rng.randrange(city.grid_width), rng.randrange(city.grid_height)))
+        engine.process_input()
+        if engine.showing_problem:
+            answer = engine.current_problem["answer"]
+            if rng.random() < config["accuracy"]:
+                correct += 1
+            else:
+                answer += "1"
+            answered += 1
+            script.push("type", answer)
+            script.push("enter")
+            engine.process_input()
+        for _ in range(ticks_per_turn):
+            engine.tick()
+
+    report = engine.economy.report(city)
+    return {
+        "seed": seed,
+        "coins": engine.coins,
+        "income": report["total_income"],
+        "population": report["total_population"],
+        "buildings": dict(Counter(building["type"] for building in city.buildings.values())),
+        "answered": answered,
+        "correct": correct,
+        "ticks": engine.tick_count
+    }
+
+def _run_chunk(seeds: Iterable[int], config: Dict[str, Any]):
+    return [run_game(seed, config) for seed in seeds]
+
+class Summary:
+    # Running totals, so results can be dropped once counted
+    def __init__(self):
+        self.games = 0
+        self.totals: Counter = Counter()
+        self.minimum: Dict[str, float] = {}
+        self.maximum: Dict[str, float] = {}
+        self.buildings: Counter = Counter()
+
+    def add(self, result: Dict[str, Any]):
+        self.games += 1
+        for key in ("coins", "income", "population", "answered", "correct"):
+            value = result[key]
+            self.totals[key] += value
+            self.minimum[key] = min(self.minimum.get(key, value), value)
+            self.maximum[key] = max(self.maximum.get(key, value), value)
+        self.buildings.update(result["buildings"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        games = max(1, self.games)
+        return {
+            "games": self.games,
+            "mean": {key: total / games for key, total in self.totals.items()},
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean_buildings": {name: count / games for name, count in self.buildings.items()},
+            "accuracy": self.totals["correct"] / max(1, self.totals["answered"])
+        }
+
+def run_batch(games: int, config: Dict[str, Any], seed: int = 0, workers: Optional[int] = None,
+              chunk_size: int = 8, output=None) -> Dict[str, Any]:
+    # Games run in chunks of seeds on a process pool. Results stream back in
+    # seed order into the summary (and one JSON line each to `output`)
+    summary = Summary()
+    starts = range(seed, seed + games, chunk_size)
+    chunks = [range(start, min(start + chunk_size, seed + games)) for start in starts]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for results in executor.map(_run_chunk, chunks, [config] * len(chunks)):
+            for result in results:
+                summary.add(result)
+                if output is not None:
+                    output.write(json.dumps(result) + "\n")
+    return summary.as_dict()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many scripted headless games in parallel")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--chunk-size", type=int, default=8, help="games sent to a worker at a time")
+    parser.add_argument("--turns", type=int, default=DEFAULT_CONFIG["turns"])
+    parser.add_argument("--accuracy", type=float, default=DEFAULT_CONFIG["accuracy"])
+    parser.add_argument("--seconds-per-turn", type=float, default=DEFAULT_CONFIG["seconds_per_turn"])
+    parser.add_argument("--grid", default=f"{DEFAULT_CONFIG['grid_width']}x{DEFAULT_CONFIG['grid_height']}",
+                        help="grid size as WIDTHxHEIGHT")
+    parser.add_argument("--output", help="write each game's result as a JSON line to this path")
+    args = parser.parse_args()
+
+    grid_width, grid_height = (int(value) for value in args.grid.lower().split("x"))
+    config = dict(DEFAULT_CONFIG, grid_width=grid_width, grid_height=grid_height, turns=args.turns,
+                  accuracy=args.accuracy, seconds_per_turn=args.seconds_per_turn)
+
+    start = time.perf_counter()
+    output = open(args.output, "w") if args.output else None
+    try:
+        summary = run_batch(args.games, config, args.seed, args.workers, args.chunk_size, output)
+    finally:
+        if output is not None:
+            output.close()
+    summary["seconds"] = time.perf_counter() - start
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
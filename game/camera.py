@@ -0,0 +1,84 @@
+from typing import Tuple
+
+# Zoom factors relative to the base grid size, smallest first
+ZOOM_LEVELS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0)
+
+class Camera:
+    def __init__(self, viewport_width: int, viewport_height: int, grid_size: int,
+                 grid_width: int, grid_height: int):
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self.grid_size = grid_size
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+
+        # Top-left corner of the viewport in (fractional) grid cells
+        self.x = 0.0
+        self.y = 0.0
+        self.zoom_index = ZOOM_LEVELS.index(1.0)
+
+    @property
+    def zoom(self) -> float:
+        return ZOOM_LEVELS[self.zoom_index]
+
+    @property
+    def cell_size(self) -> int:
+        # Whole pixels per cell so grid lines and chunks line up exactly
+        return max(1, int(self.grid_size * self.zoom))
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        # World pixel (at the current zoom) shown at the viewport's top-left
+        cell_size = self.cell_size
+        return round(self.x * cell_size), round(self.y * cell_size)
+
+    def screen_to_grid(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        origin_x, origin_y = self.origin
+        cell_size = self.cell_size
+        return (pos[0] + origin_x) // cell_size, (pos[1] + origin_y) // cell_size
+
+    def grid_to_screen(self, grid_x: int, grid_y: int) -> Tuple[int, int]:
+        origin_x, origin_y = self.origin
+        cell_size = self.cell_size
+        return grid_x * cell_size - origin_x, grid_y * cell_size - origin_y
+
+    def visible_cells(self) -> Tuple[int, int, int, int]:
+        # Half-open cell range (x0, y0, x1, y1) intersecting the viewport
+        origin_x, origin_y = self.origin
+        cell_size = self.cell_size
+        x0 = max(0, origin_x // cell_size)
+        y0 = max(0, origin_y // cell_size)
+        x1 = min(self.grid_width, -(-(origin_x + self.viewport_width) // cell_size))
+        y1 = min(self.grid_height, -(-(origin_y + self.viewport_height) // cell_size))
+        return x0, y0, x1, y1
+
+    def pan(self, dx: float, dy: float):
+        # Move the view by a screen-pixel offset
+        self.x += dx / self.cell_size
+        self.y += dy / self.cell_size
+        self._clamp()
+
+    def zoom_by(self, steps: int, anchor: Tuple[int, int]):
+        # Change zoom level while keeping the point under the anchor fixed
+        new_index = min(max(self.zoom_index + steps, 0), len(ZOOM_LEVELS) - 1)
+        if new_index == self.zoom_index:
+            return
+
+        old_cell_size = self.cell_size
+        world_x = self.x + anchor[0] / old_cell_size
+        world_y = self.y + anchor[1] / old_cell_size
+        self.zoom_index = new_index
+        self.x = world_x - anchor[0] / self.cell_size
+        self.y = world_y - anchor[1] / self.cell_size
+        self._clamp()
+
+    def center_on(self, grid_x: float, grid_y: float):
+        self.x = grid_x - self.viewport_width / self.cell_size / 2
+        self.y = grid_y - self.viewport_height / self.cell_size / 2
+        self._clamp()
+
+    def _clamp(self):
+        max_x = max(0.0, self.grid_width - self.viewport_width / self.cell_size)
+        max_y = max(0.0, self.grid_height - self.viewport_height / self.cell_size)
+        self.x = min(max(self.x, 0.0), max_x)
+        self.y = min(max(self.y, 0.0), max_y)
@@ -1,18 +1,69 @@
+import numpy as np
 import pygame
-from typing import Dict, Tuple, Optional
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from .camera import Camera
+from .spatial import SpatialIndex
+from .sprites import Sprite, SpriteCache
+
+# Largest table region updated in place after a placement; beyond this the
+# summed-area table is rebuilt lazily on the next bulk query instead
+SAT_INCREMENTAL_LIMIT = 1 << 16
+
+# Side length, in cells, of the square chunks the world is rendered in
+CHUNK_SIZE = 16
+
+STARTING_COINS = 1000
+
+# Viewport (width, height, cell size in pixels) of the city area in the game
+# window; cities that are never drawn (batch games, the server, benchmarks)
+# use the same one
+DEFAULT_VIEWPORT = (1124, 798, 40)
 
 class City:
-    def __init__(self, width: int, height: int, grid_size: int):
+    def __init__(self, width: int, height: int, grid_size: int,
+                 grid_width: Optional[int] = None, grid_height: Optional[int] = None):
+        # width/height are the viewport in pixels; the world defaults to
+        # exactly filling it but may be any number of cells
         self.width = width
         self.height = height
         self.grid_size = grid_size
-        self.grid_width = width // grid_size
-        self.grid_height = height // grid_size
-        self.grid: Dict[Tuple[int, int], str] = {}
+        self.grid_width = grid_width if grid_width is not None else width // grid_size
+        self.grid_height = grid_height if grid_height is not None else height // grid_size
+        self.camera = Camera(width, height, grid_size, self.grid_width, self.grid_height)
+
+        # Placed buildings by id
+        self.buildings: Dict[int, Dict[str, Any]] = {}
+        self._next_building_id = 1
+
+        # The treasury belongs to the city so saves and autosaves carry it
+        self.coins = float(STARTING_COINS)
+
+        # Bumped on every change so derived data (e.g. the economy) can be cached
+        self.version = 0
+
+        # Called as listener(op, building) after every successful change
+        self.listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+        # Pre-rendered chunks (grass, grid lines and buildings) at the
+        # current zoom, allocated when first visible and evicted LRU. Chunk
+        # building lists are derived lazily from id_grid. Placements queue
+        # dirty footprints that are redrawn into cached chunks on next draw.
+        self._chunk_surfaces: "OrderedDict[Tuple[int, int], pygame.Surface]" = OrderedDict()
+        self._chunk_cell_size = 0
+        self._chunk_members: Dict[Tuple[int, int], np.ndarray] = {}
+        self._dirty_buildings: List[Tuple[str, int, int]] = []
+
+        # One pre-rendered sprite per building type and scale
+        self.sprites = SpriteCache()
+
+        # Translucent placement previews keyed by (size, color)
+        self._preview_surfaces: Dict[Tuple[Tuple[int, int], Tuple[int, int, int]], pygame.Surface] = {}
         
         # Building types and their properties with enhanced visuals
         self.building_types = {
             "house": {
+                "cost": 100,
                 "color": (100, 100, 255),
                 "size": 1,
                 "border_color": (80, 80, 200),
@@ -20,6 +71,7 @@ class City:
                 "window_color": (255, 255, 200)
             },
             "shop": {
+                "cost": 250,
                 "color": (255, 100, 100),
                 "size": 2,
                 "border_color": (200, 80, 80),
@@ -27,6 +79,7 @@ class City:
                 "window_color": (200, 200, 255)
             },
             "factory": {
+                "cost": 500,
                 "color": (100, 255, 100),
                 "size": 3,
                 "border_color": (80, 200, 80),
@@ -34,6 +87,7 @@ class City:
                 "window_color": (150, 150, 150)
             },
             "park": {
+                "cost": 150,
                 "color": (100, 255, 100),
                 "size": 2,
                 "border_color": (80, 200, 80),
@@ -42,31 +96,181 @@ class City:
             }
         }
 
+        # Occupancy arrays indexed [y, x]: a type code and the id of the
+        # building covering each cell (0 means empty)
+        self.type_names: List[Optional[str]] = [None] + list(self.building_types)
+        self.type_codes = {name: code for code, name in enumerate(self.type_names) if name}
+        self._type_sizes = np.array([0] + [self.building_types[name]["size"] for name in self.type_names[1:]])
+        self.type_grid = np.zeros((self.grid_height, self.grid_width), dtype=np.uint8)
+        self.id_grid = np.zeros((self.grid_height, self.grid_width), dtype=np.int32)
+
+        # Summed-area table of occupancy with a leading zero row and column,
+        # so any footprint's occupied-cell count is four lookups
+        self._occupancy_sat = np.zeros((self.grid_height + 1, self.grid_width + 1), dtype=np.int32)
+        self._sat_dirty = False
+
+        # Bucket-grid index behind the area queries, built on first use
+        self._spatial: Optional[SpatialIndex] = None
+
     def draw(self, screen):
+        cell_size = self.camera.cell_size
+        if cell_size != self._chunk_cell_size:
+            self._chunk_surfaces.clear()
+            self._dirty_buildings.clear()
+            self._chunk_cell_size = cell_size
+
+        self._redraw_dirty(cell_size)
+
+        # Cull to the chunks intersecting the viewport
+        x0, y0, x1, y1 = self.camera.visible_cells()
+        origin_x, origin_y = self.camera.origin
+        chunk_px = CHUNK_SIZE * cell_size
+        viewport = pygame.Rect(0, 0, self.width, self.height)
+        if (self.grid_width * cell_size - origin_x < self.width
+                or self.grid_height * cell_size - origin_y < self.height):
+            screen.fill((60, 120, 60), viewport)
+
+        blits = []
+        for chunk_y in range(y0 // CHUNK_SIZE, -(-y1 // CHUNK_SIZE)):
+            for chunk_x in range(x0 // CHUNK_SIZE, -(-x1 // CHUNK_SIZE)):
+                surface = self._get_chunk_surface(chunk_x, chunk_y, cell_size)
+                blits.append((surface, (chunk_x * chunk_px - origin_x, chunk_y * chunk_px - origin_y)))
+
+        clip = screen.get_clip()
+        screen.set_clip(viewport)
+        screen.blits(blits, doreturn=False)
+        screen.set_clip(clip)
+
+        # Keep roughly two screens' worth of chunks around for panning
+        while len(self._chunk_surfaces) > max(2 * len(blits), 4):
+            self._chunk_surfaces.popitem(last=False)
+
+    def screen_to_grid(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        return self.camera.screen_to_grid(pos)
+
+    def invalidate(self):
+        # Drop every cached chunk so the next draw re-renders from scratch
+        self._chunk_surfaces.clear()
+        self._chunk_members.clear()
+        self._dirty_buildings.clear()
+
+    def _get_chunk_surface(self, chunk_x: int, chunk_y: int, cell_size: int) -> pygame.Surface:
+        key = (chunk_x, chunk_y)
+        surface = self._chunk_surfaces.get(key)
+        if surface is not None:
+            self._chunk_surfaces.move_to_end(key)
+            return surface
+
+        # Chunks on the world's far edges are cut to the grid
+        cells_x = min(CHUNK_SIZE, self.grid_width - chunk_x * CHUNK_SIZE)
+        cells_y = min(CHUNK_SIZE, self.grid_height - chunk_y * CHUNK_SIZE)
+        surface = pygame.Surface((cells_x * cell_size, cells_y * cell_size))
+        self._render_chunk(surface, chunk_x, chunk_y, cell_size, surface.get_rect())
+        self._chunk_surfaces[key] = surface
+        return surface
+
+    def _redraw_dirty(self, cell_size: int):
+        chunk_px = CHUNK_SIZE * cell_size
+        for building_type, grid_x, grid_y in self._dirty_buildings:
+            bounds = self._building_bounds(building_type, grid_x, grid_y, cell_size)
+            for chunk_y in range(bounds.top // chunk_px, (bounds.bottom - 1) // chunk_px + 1):
+                for chunk_x in range(bounds.left // chunk_px, (bounds.right - 1) // chunk_px + 1):
+                    surface = self._chunk_surfaces.get((chunk_x, chunk_y))
+                    if surface is None:
+                        continue
+                    area = bounds.move(-chunk_x * chunk_px, -chunk_y * chunk_px).clip(surface.get_rect())
+                    if area.width and area.height:
+                        self._render_chunk(surface, chunk_x, chunk_y, cell_size, area)
+        self._dirty_buildings.clear()
+
+    def _mark_dirty(self, building_type: str, grid_x: int, grid_y: int):
+        # Nothing to redraw until a chunk has been rendered
+        if self._chunk_surfaces:
+            self._dirty_buildings.append((building_type, grid_x, grid_y))
+
+        # Forget the building lists of every chunk the drawing touches
+        margin = self._overhang_cells()
+        size = self.building_types[building_type]["size"]
+        for chunk_y in range((grid_y - margin) // CHUNK_SIZE, (grid_y + size - 1) // CHUNK_SIZE + 1):
+            for chunk_x in range(grid_x // CHUNK_SIZE, (grid_x + size - 1 + margin) // CHUNK_SIZE + 1):
+                self._chunk_members.pop((chunk_x, chunk_y), None)
+
+    def _overhang_cells(self) -> int:
+        # Whole cells a drawing can spill above/right of its footprint
+        largest = max(building["size"] for building in self.building_types.values())
+        return -(-largest // 3)
+
+    def _get_chunk_members(self, chunk_x: int, chunk_y: int) -> np.ndarray:
+        key = (chunk_x, chunk_y)
+        members = self._chunk_members.get(key)
+        if members is None:
+            # Buildings below or left of the chunk may overhang into it
+            margin = self._overhang_cells()
+            x0 = max(0, chunk_x * CHUNK_SIZE - margin)
+            y0 = chunk_y * CHUNK_SIZE
+            x1 = (chunk_x + 1) * CHUNK_SIZE
+            y1 = (chunk_y + 1) * CHUNK_SIZE + margin
+            members = np.unique(self.id_grid[y0:y1, x0:x1])
+            members = members[members != 0]
+            self._chunk_members[key] = members
+        return members
+
+    def _render_chunk(self, surface, chunk_x: int, chunk_y: int, cell_size: int, area: pygame.Rect):
+        surface.set_clip(area)
+        left = chunk_x * CHUNK_SIZE * cell_size
+        top = chunk_y * CHUNK_SIZE * cell_size
+        width, height = surface.get_size()
+
         # Draw grass background
-        screen.fill((100, 200, 100))
+        surface.fill((100, 200, 100), area)
         
         # Draw grid lines with a more subtle look
-        for x in range(0, self.width, self.grid_size):
-            pygame.draw.line(screen, (80, 180, 80), (x, 0), (x, self.height), 1)
-        for y in range(0, self.height, self.grid_size):
-            pygame.draw.line(screen, (80, 180, 80), (0, y), (self.width, y), 1)
+        for x in range(area.left - area.left % cell_size, area.right, cell_size):
+            pygame.draw.line(surface, (80, 180, 80), (x, 0), (x, height), 1)
+        for y in range(area.top - area.top % cell_size, area.bottom, cell_size):
+            pygame.draw.line(surface, (80, 180, 80), (0, y), (width, y), 1)
 
-        # Draw buildings
-        for (x, y), building_type in self.grid.items():
-            self._draw_building(screen, x, y, building_type)
+        # Draw buildings touching the area, oldest first so overlaps match
+        # across chunk borders
+        blits = []
+        for building_id in self._get_chunk_members(chunk_x, chunk_y):
+            building = self.buildings[int(building_id)]
+            bounds = self._building_bounds(building["type"], building["x"], building["y"], cell_size)
+            bounds.move_ip(-left, -top)
+            if bounds.colliderect(area):
+                sprite, _ = self._get_sprite(building["type"], cell_size)
+                blits.append((sprite, bounds))
+        surface.blits(blits, doreturn=False)
 
-    def _draw_building(self, screen, grid_x: int, grid_y: int, building_type: str):
-        building = self.building_types[building_type]
-        size = building["size"]
-        
-        # Calculate base rectangle
-        base_rect = pygame.Rect(
-            grid_x * self.grid_size,
-            grid_y * self.grid_size,
-            self.grid_size * size,
-            self.grid_size * size
+        surface.set_clip(None)
+
+    def _get_sprite(self, building_type: str, cell_size: int) -> Sprite:
+        key = (building_type, self.grid_size, cell_size / self.grid_size)
+        return self.sprites.get(key, lambda: self._render_sprite(building_type, cell_size))
+
+    def _render_sprite(self, building_type: str, cell_size: int) -> Sprite:
+        # Transparent surface covering _building_bounds, with the footprint
+        # at the bottom-left below the roof/smoke overhang
+        bounds = self._building_bounds(building_type, 0, 0, cell_size)
+        sprite = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        extent = cell_size * self.building_types[building_type]["size"]
+        self._draw_building(sprite, pygame.Rect(0, -bounds.top, extent, extent), building_type)
+        return sprite, bounds.topleft
+
+    def _building_bounds(self, building_type: str, grid_x: int, grid_y: int, cell_size: int) -> pygame.Rect:
+        # World-pixel footprint plus the roof/smoke drawn above it and the
+        # factory windows that spill past its right edge
+        extent = cell_size * self.building_types[building_type]["size"]
+        overhang = extent // 3
+        return pygame.Rect(
+            grid_x * cell_size,
+            grid_y * cell_size - overhang,
+            extent + overhang,
+            extent + overhang
         )
+
+    def _draw_building(self, screen, base_rect: pygame.Rect, building_type: str):
+        building = self.building_types[building_type]
         
         # Draw building base
         pygame.draw.rect(screen, building["color"], base_rect)
@@ -179,44 +383,269 @@ class City:
             border_color = (200, 0, 0)
 
         size = self.building_types[building_type]["size"]
+        cell_size = self.camera.cell_size
         rect = pygame.Rect(
-            grid_x * self.grid_size,
-            grid_y * self.grid_size,
-            self.grid_size * size,
-            self.grid_size * size
+            self.camera.grid_to_screen(grid_x, grid_y),
+            (cell_size * size, cell_size * size)
         )
         
         # Draw semi-transparent preview with border
-        preview = pygame.Surface((rect.width, rect.height))
-        preview.set_alpha(128)
-        preview.fill(color)
+        clip = screen.get_clip()
+        screen.set_clip(pygame.Rect(0, 0, self.width, self.height))
+        key = (rect.size, color)
+        preview = self._preview_surfaces.get(key)
+        if preview is None:
+            # Only a few sizes and colors exist per zoom level
+            if len(self._preview_surfaces) >= 32:
+                self._preview_surfaces.clear()
+            preview = pygame.Surface(rect.size)
+            preview.set_alpha(128)
+            preview.fill(color)
+            self._preview_surfaces[key] = preview
         screen.blit(preview, rect)
         pygame.draw.rect(screen, border_color, rect, 2)
+        screen.set_clip(clip)
 
     def _can_place_building(self, building_type: str, grid_x: int, grid_y: int) -> bool:
         size = self.building_types[building_type]["size"]
         
         # Check if building fits within grid
+        if grid_x < 0 or grid_y < 0:
+            return False
         if grid_x + size > self.grid_width or grid_y + size > self.grid_height:
             return False
             
         # Check if space is empty
-        for x in range(grid_x, grid_x + size):
-            for y in range(grid_y, grid_y + size):
-                if (x, y) in self.grid:
-                    return False
-                    
-        return True
+        return self._occupied_count(grid_x, grid_y, size) == 0
+
+    def valid_placements(self, building_type: str) -> np.ndarray:
+        # Boolean [y, x] mask of every anchor where the building would fit
+        size = self.building_types[building_type]["size"]
+        mask = np.zeros((self.grid_height, self.grid_width), dtype=bool)
+        rows = self.grid_height - size + 1
+        cols = self.grid_width - size + 1
+        if rows <= 0 or cols <= 0:
+            return mask
+
+        self._ensure_sat()
+        sat = self._occupancy_sat
+        counts = sat[size:, size:] - sat[:rows, size:] - sat[size:, :cols] + sat[:rows, :cols]
+        mask[:rows, :cols] = counts == 0
+        return mask
+
+    def _occupied_count(self, grid_x: int, grid_y: int, size: int) -> int:
+        # A stale table is not rebuilt for single checks, the slice is cheaper
+        if self._sat_dirty:
+            return int(np.count_nonzero(self.id_grid[grid_y:grid_y + size, grid_x:grid_x + size]))
+
+        sat = self._occupancy_sat
+        x1 = grid_x + size
+        y1 = grid_y + size
+        return int(sat[y1, x1] - sat[grid_y, x1] - sat[y1, grid_x] + sat[grid_y, grid_x])
+
+    def _update_sat(self, grid_x: int, grid_y: int, size: int, delta: int):
+        rows = self.grid_height - grid_y
+        cols = self.grid_width - grid_x
+        if self._sat_dirty or rows * cols > SAT_INCREMENTAL_LIMIT:
+            self._sat_dirty = True
+            return
+
+        # Every table entry below and right of the anchor gains the part of
+        # the footprint that lies above and left of it
+        row_weights = np.minimum(np.arange(1, rows + 1, dtype=np.int32), size)
+        col_weights = np.minimum(np.arange(1, cols + 1, dtype=np.int32), size)
+        self._occupancy_sat[grid_y + 1:, grid_x + 1:] += delta * np.outer(row_weights, col_weights)
+
+    def _ensure_sat(self):
+        if self._sat_dirty:
+            occupied = self.id_grid != 0
+            self._occupancy_sat[1:, 1:] = occupied.cumsum(axis=0, dtype=np.int32).cumsum(axis=1)
+            self._sat_dirty = False
 
     def place_building(self, building_type: str, grid_x: int, grid_y: int) -> bool:
         if not self._can_place_building(building_type, grid_x, grid_y):
             return False
             
         size = self.building_types[building_type]["size"]
-        for x in range(grid_x, grid_x + size):
-            for y in range(grid_y, grid_y + size):
-                self.grid[(x, y)] = building_type
+        building = self._new_building(building_type, grid_x, grid_y)
+        self.type_grid[grid_y:grid_y + size, grid_x:grid_x + size] = self.type_codes[building_type]
+        self.id_grid[grid_y:grid_y + size, grid_x:grid_x + size] = building["id"]
+        self._update_sat(grid_x, grid_y, size, 1)
+        self._changed("place", [building])
+        return True
+
+    def place_many(self, placements: Sequence[Tuple[str, int, int]]) -> Optional[List[int]]:
+        # Place every (type, x, y) or none of them. The batch is rejected if
+        # any footprint is out of bounds, covers an occupied cell or overlaps
+        # another footprint in the batch. Returns the new building ids
+        if not placements:
+            return []
+        codes = np.array([self.type_codes[building_type] for building_type, _, _ in placements], dtype=np.uint8)
+        xs = np.array([grid_x for _, grid_x, _ in placements], dtype=np.int64)
+        ys = np.array([grid_y for _, _, grid_y in placements], dtype=np.int64)
+        sizes = self._type_sizes[codes]
+        if ((xs < 0) | (ys < 0) | (xs + sizes > self.grid_width) | (ys + sizes > self.grid_height)).any():
+            return None
+
+        cells_x, cells_y, owners = self._footprint_cells(xs, ys, sizes)
+        if self.id_grid[cells_y, cells_x].any():
+            return None
+        cells = cells_y * self.grid_width + cells_x
+        if np.unique(cells).size != cells.size:
+            return None
+
+        buildings = [self._new_building(building_type, grid_x, grid_y)
+                     for building_type, grid_x, grid_y in placements]
+        ids = np.array([building["id"] for building in buildings], dtype=np.int32)
+        self.type_grid[cells_y, cells_x] = codes[owners]
+        self.id_grid[cells_y, cells_x] = ids[owners]
+        if len(buildings) == 1:
+            self._update_sat(int(xs[0]), int(ys[0]), int(sizes[0]), 1)
+        else:
+            self._sat_dirty = True
+        self._changed("place", buildings)
+        return ids.tolist()
+
+    def remove_building(self, building_id: int) -> bool:
+        building = self.buildings.get(building_id)
+        if building is None:
+            return False
+        self._remove_buildings([building])
         return True
 
+    def clear_region(self, grid_x: int, grid_y: int, width: int, height: int) -> List[Dict[str, Any]]:
+        # Remove every building overlapping the cell rectangle and return them
+        buildings = self.buildings_in_rect(grid_x, grid_y, width, height)
+        if buildings:
+            self._remove_buildings(buildings)
+        return buildings
+
+    def _remove_buildings(self, buildings: List[Dict[str, Any]]):
+        # Clear the footprints in one pass over their bounding box
+        x0 = min(building["x"] for building in buildings)
+        y0 = min(building["y"] for building in buildings)
+        x1 = max(building["x"] + building["size"] for building in buildings)
+        y1 = max(building["y"] + building["size"] for building in buildings)
+        ids = np.array([building["id"] for building in buildings], dtype=np.int32)
+        mask = np.isin(self.id_grid[y0:y1, x0:x1], ids)
+        self.id_grid[y0:y1, x0:x1][mask] = 0
+        self.type_grid[y0:y1, x0:x1][mask] = 0
+
+        for building in buildings:
+            del self.buildings[building["id"]]
+        if len(buildings) == 1:
+            self._update_sat(x0, y0, buildings[0]["size"], -1)
+        else:
+            self._sat_dirty = True
+        self._changed("remove", buildings)
+
+    def _new_building(self, building_type: str, grid_x: int, grid_y: int) -> Dict[str, Any]:
+        building_id = self._next_building_id
+        self._next_building_id += 1
+        building = {
+            "id": building_id,
+            "type": building_type,
+            "x": grid_x,
+            "y": grid_y,
+            "size": self.building_types[building_type]["size"]
+        }
+        self.buildings[building_id] = building
+        return building
+
+    def _footprint_cells(self, xs: np.ndarray, ys: np.ndarray,
+                         sizes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Every cell covered by the footprints, with the index of its owner
+        cells_x, cells_y, owners = [], [], []
+        for size in np.unique(sizes):
+            index = np.nonzero(sizes == size)[0]
+            offset_y, offset_x = np.divmod(np.arange(size * size), size)
+            cells_x.append((xs[index, None] + offset_x).ravel())
+            cells_y.append((ys[index, None] + offset_y).ravel())
+            owners.append(np.repeat(index, size * size))
+        return np.concatenate(cells_x), np.concatenate(cells_y), np.concatenate(owners)
+
+    def _changed(self, op: str, buildings: List[Dict[str, Any]]):
+        # Bookkeeping shared by every placement and removal once the grids
+        # are updated: cache version, spatial index, render caches, listeners
+        self.version += 1
+        for building in buildings:
+            if self._spatial is not None:
+                if op == "place":
+                    self._spatial.add(building)
+                else:
+                    self._spatial.remove(building)
+            self._mark_dirty(building["type"], building["x"], building["y"])
+            for listener in self.listeners:
+                listener(op, building)
+
+    def restore(self, type_grid: np.ndarray, id_grid: np.ndarray,
+                buildings: Dict[int, Dict[str, Any]], next_building_id: int):
+        # Swap in loaded state; the summed-area table and every render cache
+        # are rebuilt lazily from it
+        if type_grid.shape != (self.grid_height, self.grid_width) or id_grid.shape != type_grid.shape:
+            raise ValueError(f"Grid shape {type_grid.shape} does not match the "
+                             f"{self.grid_width}x{self.grid_height} city")
+        self.type_grid = type_grid
+        self.id_grid = id_grid
+        self.buildings = buildings
+        self._next_building_id = next_building_id
+        self._sat_dirty = True
+        self._spatial = None
+        self.version += 1
+        self.invalidate()
+
+    def _in_bounds(self, grid_x: int, grid_y: int) -> bool:
+        return 0 <= grid_x < self.grid_width and 0 <= grid_y < self.grid_height
+
     def get_building_at(self, grid_x: int, grid_y: int) -> Optional[str]:
-        return self.grid.get((grid_x, grid_y)) 
\ No newline at end of file
+        if not self._in_bounds(grid_x, grid_y):
+            return None
+        return self.type_names[self.type_grid[grid_y, grid_x]]
+
+    def get_instance_at(self, grid_x: int, grid_y: int) -> Optional[Dict[str, Any]]:
+        if not self._in_bounds(grid_x, grid_y):
+            return None
+        building_id = int(self.id_grid[grid_y, grid_x])
+        return self.buildings.get(building_id) if building_id else None
+
+    def _get_spatial(self) -> SpatialIndex:
+        if self._spatial is None:
+            largest = max(building["size"] for building in self.building_types.values())
+            self._spatial = SpatialIndex(self.grid_width, self.grid_height, largest)
+            for building in self.buildings.values():
+                self._spatial.add(building)
+        return self._spatial
+
+    def buildings_in_rect(self, grid_x: int, grid_y: int, width: int, height: int,
+                          building_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Buildings whose footprint overlaps the cell rectangle
+        return self._get_spatial().in_rect(grid_x, grid_y, width, height, building_type)
+
+    def buildings_in_radius(self, grid_x: int, grid_y: int, radius: float,
+                            building_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Buildings with a footprint cell within `radius` cells of (grid_x, grid_y)
+        return self._get_spatial().in_radius(grid_x, grid_y, radius, building_type)
+
+    def count_cells(self, x0, y0, x1, y1, building_type: Optional[str] = None) -> np.ndarray:
+        # Occupied cells (of one building type, if given) in each box
+        # [x0, x1) x [y0, y1); coordinates are broadcast arrays and boxes are
+        # clipped to the grid
+        x0, y0, x1, y1 = np.broadcast_arrays(np.clip(x0, 0, self.grid_width), np.clip(y0, 0, self.grid_height),
+                                             np.clip(x1, 0, self.grid_width), np.clip(y1, 0, self.grid_height))
+        if building_type is None:
+            self._ensure_sat()
+            sat = self._occupancy_sat
+        elif x0.size == 0:
+            return np.zeros(x0.shape, dtype=np.int32)
+        else:
+            # A table over just the boxes' bounding box
+            left, top = int(x0.min()), int(y0.min())
+            mask = self.type_grid[top:int(y1.max()), left:int(x1.max())] == self.type_codes[building_type]
+            sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+            mask.cumsum(axis=0, dtype=np.int32).cumsum(axis=1, out=sat[1:, 1:])
+            x0, x1, y0, y1 = x0 - left, x1 - left, y0 - top, y1 - top
+        return sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+
+    def nearest_building(self, grid_x: int, grid_y: int,
+                         building_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self._get_spatial().nearest(grid_x, grid_y, building_type)
@@ -0,0 +1,142 @@
+from typing import Any, Dict, Optional, Tuple
+from .city import City
+from .economy import Economy
+from .math_solver import MathSolver
+
+# The simulation advances in fixed ticks whatever the frame rate; a long
+# frame (e.g. a window drag) catches up at most MAX_FRAME_TIME of ticks
+TICK_RATE = 60
+TICK_SECONDS = 1 / TICK_RATE
+MAX_FRAME_TIME = 0.25
+
+class EngineCore:
+    # Game rules without any display, font or mouse dependency; GameEngine
+    # adds pygame rendering on top
+    def __init__(self, city: City, math_solver: MathSolver, input_source=None, problem_pool=None):
+        self.city = city
+        self.math_solver = math_solver
+        self.input_source = input_source
+        self.problem_pool = problem_pool
+        self.selected_building = None
+        self.pending_cell: Optional[Tuple[int, int]] = None
+        self.current_problem: Optional[Dict[str, Any]] = None
+        self.user_input = ""
+        self.showing_problem = False
+        self.message = ""
+        self.message_timer = 0
+        self.economy = Economy()
+        self.tick_count = 0
+        self._accumulator = 0.0
+
+        self._actions = {
+            "select": self.select_building,
+            "click": self.handle_click,
+            "click_cell": lambda cell: self.click_cell(*cell),
+            "type": self.type_text,
+            "backspace": self.backspace,
+            "enter": self.handle_enter,
+            "cancel": self.cancel
+        }
+
+    @property
+    def coins(self) -> float:
+        return self.city.coins
+
+    @coins.setter
+    def coins(self, value: float):
+        self.city.coins = value
+
+    def process_input(self):
+        # Apply every action queued on the input source
+        if self.input_source is None:
+            return
+        for name, *args in self.input_source.poll():
+            self._actions[name](*args)
+
+    def select_building(self, building_type: Optional[str]):
+        self.selected_building = building_type
+
+    def handle_click(self, mouse_pos):
+        self.click_cell(*self.city.screen_to_grid(mouse_pos))
+
+    def click_cell(self, grid_x: int, grid_y: int):
+        if self.showing_problem:
+            return
+
+        if not self.selected_building:
+            self.show_message("Please select a building type first!")
+            return
+
+        if self.coins < self.city.building_types[self.selected_building]["cost"]:
+            self.show_message("Not enough coins!")
+            return
+
+        # Check if the placement is valid
+        if not self.city._can_place_building(self.selected_building, grid_x, grid_y):
+            self.show_message("Cannot place building here!")
+            return
+
+        # Remember the clicked cell and ask a math problem for the building
+        self.pending_cell = (grid_x, grid_y)
+        if self.problem_pool is not None:
+            self.current_problem = self.problem_pool.pop(self.selected_building)
+        else:
+            self.current_problem = self.math_solver.generate_problem(self.selected_building)
+        self.showing_problem = True
+        self.user_input = ""
+
+    def type_text(self, text: str):
+        if self.showing_problem:
+            self.user_input += text
+
+    def backspace(self):
+        if self.showing_problem:
+            self.user_input = self.user_input[:-1]
+
+    def handle_enter(self):
+        if not self.showing_problem or not self.current_problem:
+            return
+
+        # Check answer; upkeep may have drained the balance while the
+        # problem was open, so the cost is checked again
+        cost = self.city.building_types[self.selected_building]["cost"]
+        if self.math_solver.check_answer(self.current_problem, self.user_input):
+            grid_x, grid_y = self.pending_cell
+            if self.coins < cost:
+                self.show_message("Not enough coins!")
+            elif self.city.place_building(self.selected_building, grid_x, grid_y):
+                self.coins -= cost
+                self.show_message("Building placed successfully!")
+            else:
+                self.show_message("Failed to place building!")
+        else:
+            self.show_message("Incorrect answer! Try again.")
+
+        self._close_problem()
+
+    def cancel(self):
+        self.selected_building = None
+        self._close_problem()
+
+    def _close_problem(self):
+        self.showing_problem = False
+        self.current_problem = None
+        self.pending_cell = None
+        self.user_input = ""
+
+    def update(self, dt: float = TICK_SECONDS):
+        # Run as many fixed ticks as the elapsed time covers
+        self._accumulator += min(dt, MAX_FRAME_TIME)
+        while self._accumulator >= TICK_SECONDS:
+            self._accumulator -= TICK_SECONDS
+            self.tick()
+
+    def tick(self):
+        self.tick_count += 1
+        if self.message_timer > 0:
+            self.message_timer -= 1
+        self.coins += self.economy.report(self.city)["total_income"] * TICK_SECONDS
+
+    def show_message(self, message, duration=60):
+        self.message = message
+        self.message_timer = duration
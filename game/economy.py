@@ -0,0 +1,206 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .city import City
+
+# Per-second rates for each building type. Houses pay tax per resident,
+# shops and factories earn a flat income, and everything pays upkeep
+BUILDING_ECONOMY = {
+    "house": {"population": 4, "income": 0.0, "upkeep": 0.0},
+    "shop": {"population": 0, "income": 3.0, "upkeep": 0.5},
+    "factory": {"population": 0, "income": 8.0, "upkeep": 1.0},
+    "park": {"population": 0, "income": 0.0, "upkeep": 1.0}
+}
+TAX_PER_RESIDENT = 0.25
+
+# Neighbourhood effects count the cells of a type within EFFECT_RADIUS of a
+# building's footprint: parks make houses happier (more residents),
+# factories make them less happy, and shops earn from nearby houses
+EFFECT_RADIUS = 3
+PARK_BOOST = 0.05
+FACTORY_PENALTY = 0.04
+HAPPINESS_RANGE = (0.25, 2.0)
+SHOP_INCOME_PER_HOUSE_CELL = 0.2
+
+def summed_area_table(mask: np.ndarray) -> np.ndarray:
+    # Summed-area table with a leading zero row and column
+    sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+    mask.cumsum(axis=0, dtype=np.int32).cumsum(axis=1, out=sat[1:, 1:])
+    return sat
+
+def window_sums(sat: np.ndarray, x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray) -> np.ndarray:
+    return sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+
+def _anchors(city: City) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Ids and top-left cells of every building: the cells to an anchor's
+    # left and above belong to something else
+    ids = city.id_grid
+    anchors = ids != 0
+    anchors[:, 1:] &= ids[:, 1:] != ids[:, :-1]
+    anchors[1:, :] &= ids[1:, :] != ids[:-1, :]
+    ys, xs = np.nonzero(anchors)
+    return ids[ys, xs], xs, ys
+
+def _evaluate_buildings(city: City, xs: np.ndarray, ys: np.ndarray,
+                        codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Income, population and happiness of the given buildings. The summed-area
+    # tables only cover the box around their effect windows, so a handful of
+    # buildings costs a handful of cells rather than the whole grid
+    codes_by_type = city.type_codes
+    table = {
+        key: np.array([0] + [BUILDING_ECONOMY[name][key] for name in city.type_names[1:]], dtype=np.float64)
+        for key in ("population", "income", "upkeep")
+    }
+    sizes = np.array([0] + [city.building_types[name]["size"] for name in city.type_names[1:]], dtype=np.int64)
+    spans = sizes[codes]
+    if not len(codes):
+        empty = np.zeros(0)
+        return empty, empty, empty
+
+    x0 = np.clip(xs - EFFECT_RADIUS, 0, city.grid_width)
+    y0 = np.clip(ys - EFFECT_RADIUS, 0, city.grid_height)
+    x1 = np.clip(xs + spans + EFFECT_RADIUS, 0, city.grid_width)
+    y1 = np.clip(ys + spans + EFFECT_RADIUS, 0, city.grid_height)
+    left = int(x0.min())
+    top = int(y0.min())
+    region = city.type_grid[top:int(y1.max()), left:int(x1.max())]
+    x0 -= left
+    x1 -= left
+    y0 -= top
+    y1 -= top
+    nearby = {
+        name: window_sums(summed_area_table(region == codes_by_type[name]), x0, y0, x1, y1)
+        for name in ("house", "factory", "park")
+    }
+
+    happiness = np.clip(1.0 + PARK_BOOST * nearby["park"] - FACTORY_PENALTY * nearby["factory"],
+                        *HAPPINESS_RANGE)
+    population = table["population"][codes] * happiness
+    income = (table["income"][codes] - table["upkeep"][codes] + TAX_PER_RESIDENT * population
+              + np.where(codes == codes_by_type["shop"], SHOP_INCOME_PER_HOUSE_CELL * nearby["house"], 0.0))
+    return income, population, happiness
+
+# A tick with more changes than this re-evaluates the whole city instead of
+# just the neighbourhoods of the changed buildings
+INCREMENTAL_LIMIT = 256
+
+class Economy:
+    def __init__(self):
+        # Per-building results and running totals. The economy listens to the
+        # city it reports on; after a change only the buildings within
+        # EFFECT_RADIUS of the changed footprints are re-evaluated, so a tick
+        # is a cache hit unless something was built since the last one
+        self._city: Optional[City] = None
+        self._version = -1
+        self._listened_version = -1
+        self._missed_change = False
+        self._changes: List[Tuple[str, Dict[str, Any]]] = []
+        self._buildings: Dict[int, Tuple[float, float, float]] = {}
+        self._houses = 0
+        self._totals = [0.0, 0.0, 0.0]
+        self._report: Dict[str, Any] = {}
+
+    def report(self, city: City) -> Dict[str, Any]:
+        if city is not self._city:
+            if self._city is not None:
+                self._city.listeners.remove(self._on_change)
+            city.listeners.append(self._on_change)
+            self._city = city
+            self._rebuild(city)
+        elif city.version != self._version:
+            # Changes that bypass the listeners (e.g. City.restore) show up
+            # as a version the listener never saw
+            if (self._missed_change or city.version != self._listened_version
+                    or len(self._changes) > INCREMENTAL_LIMIT):
+                self._rebuild(city)
+            else:
+                self._update(city)
+        else:
+            return self._report
+
+        self._changes.clear()
+        self._version = self._listened_version = city.version
+        self._missed_change = False
+        total_income, total_population, happiness = self._totals
+        self._report = {
+            "total_income": total_income,
+            "total_population": total_population,
+            "happiness": happiness / self._houses if self._houses else 1.0
+        }
+        return self._report
+
+    def evaluate(self, city: City) -> Dict[str, Any]:
+        # Per-building income and population, computed for every building at
+        # once from the occupancy grids
+        ids, xs, ys = _anchors(city)
+        codes = city.type_grid[ys, xs]
+        income, population, happiness = _evaluate_buildings(city, xs, ys, codes)
+
+        houses = codes == city.type_codes["house"]
+        return {
+            "id": ids,
+            "x": xs,
+            "y": ys,
+            "type": codes,
+            "income": income,
+            "population": population,
+            "total_income": float(income.sum()),
+            "total_population": float(population.sum()),
+            "happiness": float(happiness[houses].mean()) if houses.any() else 1.0
+        }
+
+    def _on_change(self, op: str, building: Dict[str, Any]):
+        # One version bump covers a whole batch of changes
+        if self._city.version > self._listened_version + 1:
+            self._missed_change = True
+        self._listened_version = self._city.version
+        self._changes.append((op, building))
+
+    def _rebuild(self, city: City):
+        ids, xs, ys = _anchors(city)
+        codes = city.type_grid[ys, xs]
+        income, population, happiness = _evaluate_buildings(city, xs, ys, codes)
+        houses = codes == city.type_codes["house"]
+        happiness = np.where(houses, happiness, 0.0)
+        self._buildings = dict(zip(ids.tolist(), zip(income.tolist(), population.tolist(), happiness.tolist())))
+        self._houses = int(houses.sum())
+        self._totals = [float(income.sum()), float(population.sum()), float(happiness.sum())]
+
+    def _update(self, city: City):
+        affected: Dict[int, Dict[str, Any]] = {}
+        for op, building in self._changes:
+            if op == "remove":
+                self._forget(building["id"], building["type"] == "house")
+            reach = building["size"] + 2 * EFFECT_RADIUS
+            for neighbour in city.buildings_in_rect(building["x"] - EFFECT_RADIUS, building["y"] - EFFECT_RADIUS,
+                                                    reach, reach):
+                affected[neighbour["id"]] = neighbour
+        if not affected:
+            return
+
+        neighbours = list(affected.values())
+        xs = np.array([building["x"] for building in neighbours], dtype=np.int64)
+        ys = np.array([building["y"] for building in neighbours], dtype=np.int64)
+        codes = np.array([city.type_codes[building["type"]] for building in neighbours], dtype=np.uint8)
+        ids = np.array(list(affected), dtype=np.int64)
+        self._store(city, ids, codes, *_evaluate_buildings(city, xs, ys, codes))
+
+    def _store(self, city: City, ids: np.ndarray, codes: np.ndarray, income: np.ndarray,
+               population: np.ndarray, happiness: np.ndarray):
+        # Replace the buildings' results, keeping the totals in step. Only
+        # houses count towards the mean happiness
+        houses = codes == city.type_codes["house"]
+        happiness = np.where(houses, happiness, 0.0)
+        for building_id, house, values in zip(ids.tolist(), houses.tolist(),
+                                              zip(income.tolist(), population.tolist(), happiness.tolist())):
+            self._forget(building_id, house)
+            self._buildings[building_id] = values
+            self._houses += house
+            for i, value in enumerate(values):
+                self._totals[i] += value
+
+    def _forget(self, building_id: int, house: bool):
+        values = self._buildings.pop(building_id, None)
+        if values is not None:
+            self._houses -= house
+            for i, value in enumerate(values):
+                self._totals[i] -= value
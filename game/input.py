@@ -0,0 +1,33 @@
+import pygame
+from collections import deque
+from typing import Iterable, List, Tuple
+
+# Input sources feed EngineCore. An action is a tuple of a name and its
+# arguments, e.g. ("select", "house"), ("click", (x, y)),
+# ("click_cell", (grid_x, grid_y)), ("type", "42"), ("backspace",),
+# ("enter",) or ("cancel",).
+Action = Tuple
+
+class PygameInput:
+    # Live mouse; actions are dispatched by main.Game from pygame events
+    def pointer_pos(self) -> Tuple[int, int]:
+        return pygame.mouse.get_pos()
+
+    def poll(self) -> List[Action]:
+        return []
+
+class ScriptedInput:
+    def __init__(self, actions: Iterable[Action] = ()):
+        self.pointer = (0, 0)
+        self.actions = deque(actions)
+
+    def pointer_pos(self) -> Tuple[int, int]:
+        return self.pointer
+
+    def push(self, *action):
+        self.actions.append(action)
+
+    def poll(self) -> List[Action]:
+        actions = list(self.actions)
+        self.actions.clear()
+        return actions
@@ -0,0 +1,27 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+class LRUCache:
+    def __init__(self, capacity: int):
+        # Values keyed by anything hashable, least recently used first;
+        # the oldest are evicted once more than `capacity` are held
+        self.capacity = capacity
+        self._values: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        value = self._values.get(key)
+        if value is not None:
+            self._values.move_to_end(key)
+            return value
+
+        value = create()
+        self._values[key] = value
+        while len(self._values) > self.capacity:
+            self._values.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._values.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -1,17 +1,42 @@
 import random
-from sympy import symbols, solve, diff, Eq
-from sympy.parsing.sympy_parser import parse_expr
-from typing import Dict, Any
+import re
+import numpy as np
+from fractions import Fraction
+from typing import Dict, Any, List, Optional
+from .optimization import OPTIMIZATION_TEMPLATES, compile_optimum, optimum_value, sympy_lock
+
+# Numeric answers: an integer or decimal with at most a two-digit exponent,
+# optionally over an integer denominator. Longer input or bigger exponents
+# are rejected before Fraction sees them, since Fraction("1e10000000")
+# builds a ten-million-digit integer
+MAX_NUMBER_LENGTH = 32
+NUMBER_PATTERN = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d{1,2})?(?:/\d+)?")
+
+# Question wording per problem type, shared by single and batch generation
+QUESTION_TEMPLATES = {
+    "area": "A {building_type} has a length of {length} meters and a width of {width} meters. "
+            "What is its area in square meters?",
+    "perimeter": "A {building_type} has a length of {length} meters and a width of {width} meters. "
+                 "What is its perimeter in meters?",
+    "volume": "A {building_type} has dimensions: length = {length}m, width = {width}m, and height = {height}m. "
+              "What is its volume in cubic meters?"
+}
 
 class MathSolver:
     def __init__(self):
         self.problem_types = {
             "house": ["area", "perimeter"],
-            "shop": ["area", "perimeter"],
-            "factory": ["volume", "area"],
+            "shop": ["area", "perimeter", "optimization"],
+            "factory": ["volume", "area", "optimization"],
             "park": ["area", "perimeter"]
         }
 
+        # Optimization template used for each building type
+        self.optimization_templates = {
+            "shop": "fence",
+            "factory": "open_tank"
+        }
+
     def generate_problem(self, building_type: str) -> Dict[str, Any]:
         problem_type = random.choice(self.problem_types[building_type])
         
@@ -21,6 +46,8 @@ class MathSolver:
             return self._generate_perimeter_problem(building_type)
         elif problem_type == "volume":
             return self._generate_volume_problem(building_type)
+        elif problem_type == "optimization":
+            return self._generate_optimization_problem(building_type)
         
         raise ValueError(f"Unknown problem type: {problem_type}")
 
@@ -31,7 +58,7 @@ class MathSolver:
         
         return {
             "type": "area",
-            "question": f"A {building_type} has a length of {length} meters and a width of {width} meters. What is its area in square meters?",
+            "question": QUESTION_TEMPLATES["area"].format(building_type=building_type, length=length, width=width),
             "answer": str(area)
         }
 
@@ -42,7 +69,7 @@ class MathSolver:
         
         return {
             "type": "perimeter",
-            "question": f"A {building_type} has a length of {length} meters and a width of {width} meters. What is its perimeter in meters?",
+            "question": QUESTION_TEMPLATES["perimeter"].format(building_type=building_type, length=length, width=width),
             "answer": str(perimeter)
         }
 
@@ -54,19 +81,111 @@ class MathSolver:
         
         return {
             "type": "volume",
-            "question": f"A {building_type} has dimensions: length = {length}m, width = {width}m, and height = {height}m. "
-                       f"What is its volume in cubic meters?",
+            "question": QUESTION_TEMPLATES["volume"].format(building_type=building_type, length=length,
+                                                            width=width, height=height),
             "answer": str(volume)
         }
 
+    def _generate_optimization_problem(self, building_type: str) -> Dict[str, Any]:
+        template_name = self.optimization_templates[building_type]
+        template = OPTIMIZATION_TEMPLATES[template_name]
+        parameter = template["parameter"](random.randint(*template["k_range"]))
+
+        return {
+            "type": "optimization",
+            "question": template["question"].format(building_type=building_type, p=parameter),
+            "answer": str(optimum_value(template_name, parameter))
+        }
+
+    def generate_batch(self, building_type: str, n: int, rng: Optional[np.random.Generator] = None,
+                       problem_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        # Draw every problem's type and dimensions at once; only the string
+        # formatting is left per problem. `problem_types` narrows the building
+        # type's usual mix
+        if rng is None:
+            rng = np.random.default_rng(random.getrandbits(64))
+        if problem_types is None:
+            problem_types = self.problem_types[building_type]
+        kinds = rng.integers(len(problem_types), size=n)
+        length, width, height = rng.integers(5, 21, size=(3, n))
+        answers = {
+            "area": length * width,
+            "perimeter": 2 * (length + width),
+            "volume": length * width * height
+        }
+        questions = dict(QUESTION_TEMPLATES)
+
+        # Optimization answers come from the template's compiled optimum,
+        # evaluated over the whole parameter array at once
+        parameter = np.zeros(n, dtype=np.int64)
+        if "optimization" in problem_types:
+            template_name = self.optimization_templates[building_type]
+            template = OPTIMIZATION_TEMPLATES[template_name]
+            low, high = template["k_range"]
+            parameter = template["parameter"](rng.integers(low, high + 1, size=n))
+            optimum = compile_optimum(template_name)(parameter)
+            answers["optimization"] = np.rint(optimum).astype(np.int64)
+            questions["optimization"] = template["question"]
+
+        answer = np.choose(kinds, [answers[problem_type] for problem_type in problem_types])
+
+        problems = []
+        for kind, l, w, h, p, a in zip(kinds.tolist(), length.tolist(), width.tolist(),
+                                       height.tolist(), parameter.tolist(), answer.tolist()):
+            problem_type = problem_types[kind]
+            problems.append({
+                "type": problem_type,
+                "question": questions[problem_type].format(
+                    building_type=building_type, length=l, width=w, height=h, p=p
+                ),
+                "answer": str(a)
+            })
+        return problems
+
     def check_answer(self, problem: Dict[str, Any], user_input: str) -> bool:
+        # Plain numbers (integers, decimals, fractions) are compared exactly
+        # without going through SymPy, and blank input is simply wrong
+        if not user_input.strip():
+            return False
+        user_number = self.parse_number(user_input)
+        if user_number is not None and self._correct_number(problem) is not None:
+            return self.check_number(problem, user_number)
+
+        return self._check_symbolic_answer(problem, user_input)
+
+    def check_number(self, problem: Dict[str, Any], number: Fraction) -> bool:
+        # For answers already parsed with parse_number
+        return self._correct_number(problem) == number
+
+    def _correct_number(self, problem: Dict[str, Any]) -> Optional[Fraction]:
+        if "parsed_answer" not in problem:
+            problem["parsed_answer"] = self.parse_number(problem["answer"])
+        return problem["parsed_answer"]
+
+    def parse_number(self, text: str) -> Optional[Fraction]:
+        text = text.strip()
+        if len(text) > MAX_NUMBER_LENGTH or not NUMBER_PATTERN.fullmatch(text):
+            return None
+        try:
+            return Fraction(text)
+        except (ValueError, ZeroDivisionError):
+            return None
+
+    def _check_symbolic_answer(self, problem: Dict[str, Any], user_input: str) -> bool:
+        # SymPy is slow to import, so it is only loaded once an answer
+        # actually needs symbolic parsing
+        with sympy_lock:
+            from sympy.parsing.sympy_parser import parse_expr
+
         try:
             # Parse both the correct answer and user input as expressions
-            correct_answer = parse_expr(problem["answer"])
+            if "parsed_expression" not in problem:
+                problem["parsed_expression"] = parse_expr(problem["answer"])
+            correct_answer = problem["parsed_expression"]
             user_answer = parse_expr(user_input)
             
             # Check if they're equal
             return correct_answer == user_answer
-        except:
+        except Exception:
             # If there's any error in parsing, return False
-            return False 
\ No newline at end of file
+            return False
@@ -0,0 +1,63 @@
+import functools
+import threading
+from typing import Any, Callable, Dict
+
+# Optimization problem templates. Each objective is written in the decision
+# variable x and one parameter p; the optimum is derived symbolically once per
+# template and compiled to a NumPy function. "parameter" maps a drawn integer
+# k to p so that the optimum is always a whole number.
+OPTIMIZATION_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    # Rectangle against a wall, fenced on the other three sides with p meters:
+    # A(x) = x (p - 2x) peaks at x = p/4 with A = p^2/8
+    "fence": {
+        "objective": "x * (p - 2 * x)",
+        "goal": "max",
+        "k_range": (5, 25),
+        "parameter": lambda k: 4 * k,
+        "question": "A {building_type} fences a rectangular lot against its back wall with {p} meters "
+                    "of fencing on the other three sides. What is the largest area it can enclose "
+                    "in square meters?"
+    },
+    # Open-top tank with a square base of side x and volume p:
+    # S(x) = x^2 + 4p/x bottoms out at x = (2p)^(1/3) with S = 3 (2p)^(2/3)
+    "open_tank": {
+        "objective": "x**2 + 4 * p / x",
+        "goal": "min",
+        "k_range": (2, 7),
+        "parameter": lambda k: 4 * k ** 3,
+        "question": "A {building_type} needs an open-top storage tank with a square base that holds "
+                    "{p} cubic meters. What is the least sheet metal, in square meters, it can be "
+                    "built from?"
+    }
+}
+
+# Held while SymPy is first imported and while templates are compiled; two
+# threads importing SymPy at once (e.g. a problem pool refill and a symbolic
+# answer check) can deadlock on its circular imports
+sympy_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def compile_optimum(template_name: str) -> Callable:
+    # Solve d/dx objective = 0 once and lambdify the optimal value as a
+    # function of p; SymPy is only imported the first time this runs
+    with sympy_lock:
+        from sympy import diff, lambdify, simplify, solve, symbols, sympify
+
+        template = OPTIMIZATION_TEMPLATES[template_name]
+        x, p = symbols("x p", positive=True)
+        objective = sympify(template["objective"], locals={"x": x, "p": p})
+        roots = solve(diff(objective, x), x)
+        if len(roots) != 1:
+            raise ValueError(f"Template {template_name} has {len(roots)} critical points")
+
+        # The single positive critical point must curve the way the goal needs
+        curvature = diff(objective, x, 2).subs(x, roots[0])
+        if (template["goal"] == "max" and not curvature.is_negative) or \
+                (template["goal"] == "min" and not curvature.is_positive):
+            raise ValueError(f"Template {template_name} critical point is not a {template['goal']}imum")
+
+        return lambdify(p, simplify(objective.subs(x, roots[0])), "numpy")
+
+@functools.lru_cache(maxsize=4096)
+def optimum_value(template_name: str, parameter: int) -> int:
+    return int(round(float(compile_optimum(template_name)(parameter))))
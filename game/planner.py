@@ -0,0 +1,188 @@
+import random
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+from .city import City
+from .economy import (BUILDING_ECONOMY, EFFECT_RADIUS, FACTORY_PENALTY, HAPPINESS_RANGE, PARK_BOOST,
+                      SHOP_INCOME_PER_HOUSE_CELL, TAX_PER_RESIDENT, summed_area_table, window_sums)
+
+# The planner lays out 6x6 blocks, each tiled with one building type (6 is a
+# multiple of every building size). Blocks only interact with their eight
+# neighbours because EFFECT_RADIUS is smaller than a block
+BLOCK = 6
+NEIGHBOURS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+OUTSIDE = -1
+
+Placement = Tuple[str, int, int]
+
+def _tile(size: int) -> List[Tuple[int, int]]:
+    # Anchors of one building type packed into a block
+    return [(x, y) for y in range(0, BLOCK, size) for x in range(0, BLOCK, size)]
+
+class _BlockModel:
+    def __init__(self, city: City):
+        # Score of a block as a function of its own type and its neighbours',
+        # using the economy's rates. Neighbour effects are counted once per
+        # type and offset on a 3x3-block sample
+        self.types = list(city.building_types)
+        self.tiles = [_tile(city.building_types[name]["size"]) for name in self.types]
+        self.base = []
+        for name, tile in zip(self.types, self.tiles):
+            rates = BUILDING_ECONOMY[name]
+            self.base.append(len(tile) * (rates["income"] - rates["upkeep"]))
+
+        # nearby[a][k]: summed over the buildings of an `a` block, how many
+        # cells of the block at NEIGHBOURS[k] are in effect range (every
+        # block type covers all of its cells)
+        self.nearby = []
+        for a, name in enumerate(self.types):
+            size = city.building_types[name]["size"]
+            xs = np.array([BLOCK + x for x, _ in self.tiles[a]])
+            ys = np.array([BLOCK + y for _, y in self.tiles[a]])
+            window = (xs - EFFECT_RADIUS, ys - EFFECT_RADIUS,
+                      xs + size + EFFECT_RADIUS, ys + size + EFFECT_RADIUS)
+            counts = []
+            for dy, dx in NEIGHBOURS:
+                mask = np.zeros((3 * BLOCK, 3 * BLOCK), dtype=bool)
+                mask[(1 + dy) * BLOCK:(2 + dy) * BLOCK, (1 + dx) * BLOCK:(2 + dx) * BLOCK] = True
+                counts.append(float(window_sums(summed_area_table(mask), *window).sum()))
+            self.nearby.append(counts)
+
+        self.house = self.types.index("house")
+        self.shop = self.types.index("shop")
+        self.park = self.types.index("park")
+        self.factory = self.types.index("factory")
+        self.houses = len(self.tiles[self.house])
+        self.residents = self.houses * BUILDING_ECONOMY["house"]["population"]
+
+        # Cells of existing buildings in effect range of a block's houses or
+        # shops, per layout index; see seed_existing
+        self.parks_near_houses: List[float] = []
+        self.factories_near_houses: List[float] = []
+        self.houses_near_shops: List[float] = []
+
+    def seed_existing(self, city: City, indices: List[int], left: np.ndarray, top: np.ndarray, size: int):
+        # Existing buildings are fixed neighbours of the blocks at (left, top):
+        # count their cells around each house and shop a block would hold
+        self.parks_near_houses = [0.0] * size
+        self.factories_near_houses = [0.0] * size
+        self.houses_near_shops = [0.0] * size
+        for block_type, targets in ((self.house, (("park", self.parks_near_houses),
+                                                  ("factory", self.factories_near_houses))),
+                                    (self.shop, (("house", self.houses_near_shops),))):
+            span = city.building_types[self.types[block_type]]["size"]
+            xs = left + np.array([x for x, _ in self.tiles[block_type]])[:, None]
+            ys = top + np.array([y for _, y in self.tiles[block_type]])[:, None]
+            for name, target in targets:
+                counts = city.count_cells(xs - EFFECT_RADIUS, ys - EFFECT_RADIUS,
+                                          xs + span + EFFECT_RADIUS, ys + span + EFFECT_RADIUS, name).sum(axis=0)
+                for index, count in zip(indices, counts.tolist()):
+                    target[index] = float(count)
+
+    def score(self, layout: List[int], index: int, offsets: List[int]) -> float:
+        block_type = layout[index]
+        if block_type == OUTSIDE:
+            return 0.0
+        total = self.base[block_type]
+        if block_type == self.house:
+            nearby = self.nearby[self.house]
+            parks = self.parks_near_houses[index]
+            factories = self.factories_near_houses[index]
+            for k, offset in enumerate(offsets):
+                neighbour = layout[index + offset]
+                if neighbour == self.park:
+                    parks += nearby[k]
+                elif neighbour == self.factory:
+                    factories += nearby[k]
+            happiness = 1.0 + (PARK_BOOST * parks - FACTORY_PENALTY * factories) / self.houses
+            happiness = min(max(happiness, HAPPINESS_RANGE[0]), HAPPINESS_RANGE[1])
+            total += TAX_PER_RESIDENT * self.residents * happiness
+        elif block_type == self.shop:
+            nearby = self.nearby[self.shop]
+            total += SHOP_INCOME_PER_HOUSE_CELL * self.houses_near_shops[index]
+            for k, offset in enumerate(offsets):
+                if layout[index + offset] == self.house:
+                    total += SHOP_INCOME_PER_HOUSE_CELL * nearby[k]
+        return total
+
+def plan_layout(city: City, grid_x: int, grid_y: int, width: int, height: int,
+                time_budget: float = 2.0, seed: Optional[int] = None,
+                fill_gaps: bool = True) -> List[Placement]:
+    # Pack the free part of a region for the highest economy income: a greedy
+    # pass picks each free block's best type given the blocks already chosen,
+    # then random single-block changes are kept while they do not lower the
+    # score, until the time budget runs out. Cells outside whole free blocks
+    # are filled with houses when fill_gaps is set.
+    # Existing buildings count as fixed neighbours of the planned blocks, but
+    # only for the planned buildings' own income: what the plan does to the
+    # existing buildings' income is not scored, and neither are the houses
+    # fill_gaps adds afterwards
+    deadline = time.perf_counter() + time_budget
+    rng = random.Random(seed)
+    model = _BlockModel(city)
+
+    x0 = max(0, grid_x)
+    y0 = max(0, grid_y)
+    x1 = min(city.grid_width, grid_x + width)
+    y1 = min(city.grid_height, grid_y + height)
+    columns = max(0, (x1 - x0) // BLOCK)
+    rows = max(0, (y1 - y0) // BLOCK)
+
+    # A block is usable when all of its cells are empty
+    block_x = x0 + BLOCK * np.arange(columns)
+    block_y = y0 + BLOCK * np.arange(rows)
+    grid_bx, grid_by = np.meshgrid(block_x, block_y)
+    free = city.count_cells(grid_bx, grid_by, grid_bx + BLOCK, grid_by + BLOCK) == 0
+
+    # Flat layout with a one-block OUTSIDE border so neighbour lookups never
+    # need bounds checks
+    stride = columns + 2
+    offsets = [dy * stride + dx for dy, dx in NEIGHBOURS]
+    layout = [OUTSIDE] * (stride * (rows + 2))
+    free_y, free_x = np.nonzero(free)
+    cells = [(by + 1) * stride + bx + 1 for by, bx in zip(free_y.tolist(), free_x.tolist())]
+    model.seed_existing(city, cells, x0 + BLOCK * free_x, y0 + BLOCK * free_y, len(layout))
+
+    def local_score(index: int) -> float:
+        return model.score(layout, index, offsets) + sum(model.score(layout, index + offset, offsets)
+                                                         for offset in offsets)
+
+    choices = range(len(model.types))
+    for index in cells:
+        best_type, best_score = 0, None
+        for block_type in choices:
+            layout[index] = block_type
+            score = local_score(index)
+            if best_score is None or score > best_score:
+                best_type, best_score = block_type, score
+        layout[index] = best_type
+
+    while cells and time.perf_counter() < deadline:
+        for _ in range(256):
+            index = rng.choice(cells)
+            current = layout[index]
+            before = local_score(index)
+            layout[index] = rng.choice([block_type for block_type in choices if block_type != current])
+            if local_score(index) < before:
+                layout[index] = current
+
+    placements: List[Placement] = []
+    for index in cells:
+        by, bx = divmod(index, stride)
+        left = x0 + (bx - 1) * BLOCK
+        top = y0 + (by - 1) * BLOCK
+        block_type = layout[index]
+        name = model.types[block_type]
+        placements.extend((name, left + x, top + y) for x, y in model.tiles[block_type])
+
+    if fill_gaps:
+        gaps = city.id_grid[y0:y1, x0:x1] == 0
+        gaps[:rows * BLOCK, :columns * BLOCK] &= ~free.repeat(BLOCK, axis=0).repeat(BLOCK, axis=1)
+        gap_y, gap_x = np.nonzero(gaps)
+        placements.extend(("house", x0 + x, y0 + y) for x, y in zip(gap_x.tolist(), gap_y.tolist()))
+    return placements
+
+def fill_region(city: City, grid_x: int, grid_y: int, width: int, height: int,
+                time_budget: float = 2.0, seed: Optional[int] = None) -> Optional[List[int]]:
+    # Plan and build in one all-or-nothing batch
+    return city.place_many(plan_layout(city, grid_x, grid_y, width, height, time_budget, seed))
@@ -0,0 +1,74 @@
+import random
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Set
+import numpy as np
+from .math_solver import MathSolver
+
+class ProblemPool:
+    def __init__(self, math_solver: MathSolver, target_size: int = 32):
+        # Ready-made problems per building type, topped up in batches by a
+        # background thread so a click never waits on generation
+        self.math_solver = math_solver
+        self.target_size = target_size
+        self._pools: Dict[str, Deque[Dict[str, Any]]] = {
+            building_type: deque() for building_type in math_solver.problem_types
+        }
+        self._rng = np.random.default_rng(random.getrandbits(64))
+        # Optimization problems compile SymPy templates, so a building type's
+        # pool leaves them out until that type is first popped
+        self._popped: Set[str] = set()
+        self._full_mix: Set[str] = set()
+        self._refill_wanted = threading.Event()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._refill_loop, name="problem-pool", daemon=True)
+        self._thread.start()
+        self._refill_wanted.set()
+
+    def pop(self, building_type: str) -> Dict[str, Any]:
+        if building_type not in self._popped:
+            self._popped.add(building_type)
+            self._refill_wanted.set()
+        pool = self._pools[building_type]
+        try:
+            problem = pool.popleft()
+        except IndexError:
+            # Drained faster than the refill thread keeps up
+            problem = self.math_solver.generate_problem(building_type)
+
+        if len(pool) <= self.target_size // 2:
+            self._refill_wanted.set()
+        return problem
+
+    def close(self):
+        self._closed = True
+        self._refill_wanted.set()
+        self._thread.join()
+
+    def _refill_loop(self):
+        while True:
+            self._refill_wanted.wait()
+            self._refill_wanted.clear()
+            if self._closed:
+                return
+
+            for building_type in list(self._pools):
+                if building_type in self._popped and building_type not in self._full_mix:
+                    # First use: swap in a whole pool with the full mix
+                    self._full_mix.add(building_type)
+                    self._pools[building_type] = deque(self.math_solver.generate_batch(
+                        building_type, self.target_size, self._rng))
+                    continue
+
+                pool = self._pools[building_type]
+                missing = self.target_size - len(pool)
+                if missing > 0:
+                    pool.extend(self.math_solver.generate_batch(building_type, missing, self._rng,
+                                                                self._problem_types(building_type)))
+
+    def _problem_types(self, building_type: str) -> List[str]:
+        problem_types = self.math_solver.problem_types[building_type]
+        if building_type in self._full_mix:
+            return problem_types
+        return [problem_type for problem_type in problem_types if problem_type != "optimization"]
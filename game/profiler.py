@@ -0,0 +1,132 @@
+import csv
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+import pygame
+
+class _Section:
+    def __init__(self, profiler: "FrameProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        timings = self.profiler.current
+        timings[self.name] = timings.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SECTION = _NullSection()
+
+class FrameProfiler:
+    def __init__(self, enabled: bool = False, history: int = 240, max_trace_frames: int = 36000):
+        # Per-frame section timings in seconds. The rolling history feeds the
+        # on-screen graph; the trace is what export() writes out
+        self.enabled = enabled
+        self.frame_times: Deque[float] = deque(maxlen=history)
+        self.section_history: Deque[Dict[str, float]] = deque(maxlen=history)
+        self.trace: Deque[Dict[str, float]] = deque(maxlen=max_trace_frames)
+        self.current: Dict[str, float] = {}
+        self.frame_start = 0.0
+        self.frame_index = 0
+        self.panel: Optional[pygame.Surface] = None
+
+    def section(self, name: str):
+        # Time a block with `with profiler.section("name"):`; free when disabled
+        if not self.enabled:
+            return _NULL_SECTION
+        return _Section(self, name)
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        frame_time = time.perf_counter() - self.frame_start
+        self.frame_times.append(frame_time)
+        self.section_history.append(self.current)
+        self.trace.append(dict(self.current, frame=self.frame_index, total=frame_time))
+        self.frame_index += 1
+
+    def percentile(self, percent: float) -> float:
+        if not self.frame_times:
+            return 0.0
+        ordered = sorted(self.frame_times)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def section_means(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for timings in self.section_history:
+            for name, seconds in timings.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        count = max(1, len(self.section_history))
+        return {name: seconds / count for name, seconds in totals.items()}
+
+    def export(self, path: str):
+        # CSV for spreadsheets, anything else as JSON
+        names: List[str] = []
+        for timings in self.trace:
+            for name in timings:
+                if name not in names and name not in ("frame", "total"):
+                    names.append(name)
+
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame", "total"] + names)
+                for timings in self.trace:
+                    writer.writerow([timings["frame"], timings["total"]] + [timings.get(name, 0.0) for name in names])
+        else:
+            with open(path, "w") as f:
+                json.dump({
+                    "sections": names,
+                    "p50": self.percentile(50),
+                    "p99": self.percentile(99),
+                    "frames": list(self.trace)
+                }, f)
+
+    def draw_overlay(self, screen, font, pos=(10, 10), size=(520, 140)):
+        # Rolling bar graph of frame times with 16.7 ms/33.3 ms guides and
+        # p50/p99 plus per-section means
+        if not self.enabled:
+            return
+        x, y = pos
+        width, height = size
+        if self.panel is None or self.panel.get_size() != size:
+            self.panel = pygame.Surface(size)
+            self.panel.set_alpha(200)
+            self.panel.fill((20, 20, 20))
+        screen.blit(self.panel, pos)
+
+        scale = (height - 40) / 0.0333
+        baseline = y + height - 10
+        for budget in (1 / 60, 1 / 30):
+            guide_y = baseline - int(budget * scale)
+            pygame.draw.line(screen, (90, 90, 90), (x, guide_y), (x + width, guide_y), 1)
+
+        bar_width = max(1, width // max(1, self.frame_times.maxlen))
+        for i, frame_time in enumerate(self.frame_times):
+            bar_height = min(height - 30, int(frame_time * scale))
+            color = (100, 220, 100) if frame_time <= 1 / 60 else (230, 90, 90)
+            pygame.draw.line(screen, color, (x + i * bar_width, baseline),
+                             (x + i * bar_width, baseline - bar_height), bar_width)
+
+        means = self.section_means()
+        summary = f"p50 {self.percentile(50) * 1000:.1f} ms  p99 {self.percentile(99) * 1000:.1f} ms"
+        detail = "  ".join(f"{name} {seconds * 1000:.1f}" for name, seconds in means.items())
+        screen.blit(font.render(summary, True, (230, 230, 230)), (x + 6, y + 4))
+        screen.blit(font.render(detail, True, (180, 180, 180)), (x + 6, y + 20))
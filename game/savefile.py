@@ -0,0 +1,165 @@
+import os
+import struct
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .city import City
+
+# Binary city file, little-endian:
+#   header  magic "MCTY", u16 version, u32 grid width, u32 grid height,
+#           u32 building count, u32 next building id, f64 coins (from
+#           version 2), u8 type count, then each type name as a u8 length and
+#           UTF-8 bytes (type code = index + 1)
+#   cells   uint8 type codes, [y, x] row-major, starting 8-byte aligned
+#   cells   int32 building ids, [y, x] row-major, starting 4-byte aligned
+#   table   one BUILDING_DTYPE record per building
+MAGIC = b"MCTY"
+VERSION = 2
+HEADER = struct.Struct("<4sHIIIIdB")
+# Version 1 files have no coins and load with the starting balance
+HEADER_V1 = struct.Struct("<4sHIIIIB")
+BUILDING_DTYPE = np.dtype([("id", "<i4"), ("x", "<i4"), ("y", "<i4"), ("type", "u1"), ("size", "u1")])
+
+def _align(offset: int, alignment: int) -> int:
+    return -(-offset // alignment) * alignment
+
+def _layout(header_size: int, grid_width: int, grid_height: int) -> Dict[str, int]:
+    cells = grid_width * grid_height
+    type_offset = _align(header_size, 8)
+    id_offset = _align(type_offset + cells, 4)
+    return {"types": type_offset, "ids": id_offset, "table": id_offset + 4 * cells}
+
+def building_table(city: City) -> np.ndarray:
+    table = np.empty(len(city.buildings), dtype=BUILDING_DTYPE)
+    if city.buildings:
+        table[:] = [
+            (building["id"], building["x"], building["y"], city.type_codes[building["type"]], building["size"])
+            for building in city.buildings.values()
+        ]
+    return table
+
+def save_city(city: City, path: str):
+    names = [name.encode("utf-8") for name in city.type_names[1:]]
+    header = HEADER.pack(MAGIC, VERSION, city.grid_width, city.grid_height,
+                         len(city.buildings), city._next_building_id, city.coins, len(names))
+    header += b"".join(bytes([len(name)]) + name for name in names)
+    layout = _layout(len(header), city.grid_width, city.grid_height)
+
+    # Write next to the target and swap it in, so a crash mid-save never
+    # leaves a truncated file behind
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(bytes(layout["types"] - len(header)))
+        np.ascontiguousarray(city.type_grid, dtype=np.uint8).tofile(f)
+        f.write(bytes(layout["ids"] - layout["types"] - city.type_grid.size))
+        np.ascontiguousarray(city.id_grid, dtype="<i4").tofile(f)
+        building_table(city).tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def _table_problem(table: np.ndarray, type_grid: np.ndarray, id_grid: np.ndarray,
+                   sizes: np.ndarray, next_building_id: int) -> Optional[str]:
+    # Why the building table and the grids disagree, or None if they match.
+    # `sizes` maps the file's type codes to footprint sizes
+    grid_height, grid_width = id_grid.shape
+    ids = table["id"].astype(np.int64)
+    if ((type_grid != 0) != (id_grid != 0)).any():
+        return "type and id grids disagree"
+    if type_grid.max(initial=0) >= len(sizes):
+        return "invalid type code in the grid"
+    if not len(table):
+        return "buildings missing from the table" if id_grid.any() else None
+
+    codes = table["type"].astype(np.int64)
+    if codes.min() < 1 or codes.max() >= len(sizes):
+        return "invalid building type code"
+    if ids.min() < 1 or np.unique(ids).size != ids.size:
+        return "invalid or duplicate building ids"
+    if next_building_id <= ids.max():
+        return "next building id is already in use"
+    if (table["size"] != sizes[codes]).any():
+        return "building size does not match its type"
+    xs = table["x"].astype(np.int64)
+    ys = table["y"].astype(np.int64)
+    if (xs < 0).any() or (ys < 0).any() or (xs + table["size"] > grid_width).any() \
+            or (ys + table["size"] > grid_height).any():
+        return "building outside the grid"
+    if (id_grid[ys, xs] != ids).any() or (type_grid[ys, xs] != codes).any():
+        return "building anchors do not match the grids"
+    grid_ids = np.unique(id_grid)
+    if not np.array_equal(grid_ids[grid_ids != 0], np.sort(ids)):
+        return "grid ids do not match the building table"
+    return None
+
+def load_city(path: str, width: int, height: int, grid_size: int, use_mmap: bool = True) -> City:
+    # With use_mmap the cell arrays are copy-on-write memory maps: opening is
+    # immediate, pages are read as they are touched and edits stay in memory.
+    # Any malformed or truncated file raises ValueError
+    with open(path, "rb") as f:
+        header = f.read(HEADER_V1.size)
+        if len(header) < HEADER_V1.size or header[:4] != MAGIC:
+            raise ValueError(f"{path} is not a city save file")
+        version = struct.unpack_from("<H", header, 4)[0]
+        if version == 1:
+            _, _, grid_width, grid_height, count, next_building_id, type_count = HEADER_V1.unpack(header)
+            coins = None
+        elif version == VERSION:
+            header += f.read(HEADER.size - HEADER_V1.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            _, _, grid_width, grid_height, count, next_building_id, coins, type_count = HEADER.unpack(header)
+        else:
+            raise ValueError(f"{path} has unsupported save version {version}")
+        names: List[str] = []
+        for _ in range(type_count):
+            length = f.read(1)
+            name = f.read(length[0]) if length else b""
+            if not length or len(name) < length[0]:
+                raise ValueError(f"{path} is truncated")
+            names.append(name.decode("utf-8"))
+        header_size = f.tell()
+        file_size = os.fstat(f.fileno()).st_size
+
+    layout = _layout(header_size, grid_width, grid_height)
+    if file_size != layout["table"] + count * BUILDING_DTYPE.itemsize:
+        raise ValueError(f"{path} is truncated or has trailing data")
+    shape = (grid_height, grid_width)
+    city = City(width, height, grid_size, grid_width, grid_height)
+    if use_mmap and grid_width and grid_height:
+        type_grid = np.memmap(path, dtype=np.uint8, mode="c", offset=layout["types"], shape=shape)
+        id_grid = np.memmap(path, dtype="<i4", mode="c", offset=layout["ids"], shape=shape)
+    else:
+        type_grid = np.fromfile(path, dtype=np.uint8, count=grid_width * grid_height,
+                                offset=layout["types"]).reshape(shape)
+        id_grid = np.fromfile(path, dtype="<i4", count=grid_width * grid_height,
+                              offset=layout["ids"]).reshape(shape)
+    table = np.fromfile(path, dtype=BUILDING_DTYPE, count=count, offset=layout["table"])
+
+    # Saves from a build with different building types get their codes remapped
+    unknown = [name for name in names if name not in city.type_codes]
+    if unknown:
+        raise ValueError(f"{path} uses unknown building types: {', '.join(unknown)}")
+    sizes = np.array([0] + [city.building_types[name]["size"] for name in names], dtype=np.int64)
+    problem = _table_problem(table, type_grid, id_grid, sizes, next_building_id)
+    if problem:
+        raise ValueError(f"{path} is damaged: {problem}")
+    if names != city.type_names[1:]:
+        lookup = np.array([0] + [city.type_codes[name] for name in names], dtype=np.uint8)
+        type_grid = lookup[type_grid]
+
+    buildings: Dict[int, Dict[str, Any]] = {}
+    for building_id, x, y, code, size in zip(table["id"].tolist(), table["x"].tolist(), table["y"].tolist(),
+                                             table["type"].tolist(), table["size"].tolist()):
+        buildings[building_id] = {
+            "id": building_id,
+            "type": names[code - 1],
+            "x": x,
+            "y": y,
+            "size": size
+        }
+
+    city.restore(type_grid, id_grid, buildings, next_building_id)
+    if coins is not None:
+        city.coins = coins
+    return city
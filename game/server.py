@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import os
+import struct
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+from .autosave import OPS, apply_change
+from .city import DEFAULT_VIEWPORT, City
+from .math_solver import MathSolver
+from .problem_pool import ProblemPool
+from .savefile import BUILDING_DTYPE, building_table
+
+# Wire format, little-endian. Every message is FRAME (kind, payload length)
+# followed by the payload:
+#   client -> server
+#     MSG_PLACE     PLACE (type code, x, y): ask for a placement's problem
+#     MSG_ANSWER    UTF-8 answer to the pending problem
+#   server -> client
+#     MSG_SNAPSHOT  SNAPSHOT (grid width, grid height, count), then `count`
+#                   BUILDING_DTYPE records; sent once on connect
+#     MSG_DELTA     u32 count, then `count` DELTA records (op, type code,
+#                   x, y); every change since the last tick, sent once per
+#                   tick to every client
+#     MSG_PROBLEM   UTF-8 question for the requested placement
+#     MSG_RESULT    u8 RESULT_* status
+FRAME = struct.Struct("<BI")
+PLACE = struct.Struct("<BHH")
+SNAPSHOT = struct.Struct("<HHI")
+DELTA = struct.Struct("<BBHH")
+COUNT = struct.Struct("<I")
+
+MSG_PLACE = 1
+MSG_ANSWER = 2
+MSG_SNAPSHOT = 10
+MSG_DELTA = 11
+MSG_PROBLEM = 12
+MSG_RESULT = 13
+
+RESULT_PLACED = 0
+RESULT_WRONG = 1
+RESULT_BLOCKED = 2
+RESULT_NO_PROBLEM = 3
+
+# Client messages are tiny; anything larger is a broken or hostile client
+MAX_CLIENT_PAYLOAD = 1024
+# A client that stops reading is dropped once this much is queued for it
+MAX_WRITE_BUFFER = 1 << 20
+
+def _frame(kind: int, payload: bytes = b"") -> bytes:
+    return FRAME.pack(kind, len(payload)) + payload
+
+async def _read_frame(reader: asyncio.StreamReader, limit: Optional[int] = None) -> Tuple[int, bytes]:
+    kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if limit is not None and length > limit:
+        raise ValueError(f"message of {length} bytes is too large")
+    return kind, await reader.readexactly(length)
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.pending: Optional[Tuple[str, int, int, Dict[str, Any]]] = None
+
+class GameServer:
+    def __init__(self, city: City, math_solver: MathSolver, tick_rate: int = 20):
+        # Holds the only authoritative City. Placements are validated and
+        # answers checked here; clients just mirror the broadcast deltas
+        if city.grid_width > 0xFFFF or city.grid_height > 0xFFFF:
+            raise ValueError("Grid is too large for 16-bit delta coordinates")
+        self.city = city
+        self.math_solver = math_solver
+        self.problem_pool = ProblemPool(math_solver, target_size=256)
+        self.tick_seconds = 1 / tick_rate
+        self.clients: Set[_Client] = set()
+        self._deltas: List[bytes] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
+        city.listeners.append(self._on_change)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765):
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        self._ticker = asyncio.create_task(self._tick_loop())
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._ticker.cancel()
+        self._server.close()
+        for handler in list(self._handlers):
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self.city.listeners.remove(self._on_change)
+        self.problem_pool.close()
+
+    def _on_change(self, op: str, building: Dict[str, Any]):
+        self._deltas.append(DELTA.pack(OPS[op], self.city.type_codes[building["type"]],
+                                       building["x"], building["y"]))
+
+    async def _tick_loop(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            self._flush()
+
+    def _flush(self):
+        # Encode the tick's changes once and queue the same bytes to everyone
+        if not self._deltas:
+            return
+        message = _frame(MSG_DELTA, COUNT.pack(len(self._deltas)) + b"".join(self._deltas))
+        self._deltas.clear()
+        for client in list(self.clients):
+            self._send(client, message)
+
+    def _send(self, client: _Client, message: bytes):
+        if client.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.clients.discard(client)
+            client.writer.close()
+            return
+        client.writer.write(message)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Existing clients get the pending deltas first, so the snapshot
+        # and the deltas that follow it never overlap
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        self._flush()
+        client = _Client(writer)
+        table = building_table(self.city)
+        writer.write(_frame(MSG_SNAPSHOT, SNAPSHOT.pack(self.city.grid_width, self.city.grid_height, len(table))
+                            + table.tobytes()))
+        self.clients.add(client)
+        try:
+            while True:
+                kind, payload = await _read_frame(reader, MAX_CLIENT_PAYLOAD)
+                if kind == MSG_PLACE:
+                    self._request_placement(client, *PLACE.unpack(payload))
+                elif kind == MSG_ANSWER:
+                    self._answer(client, payload.decode("utf-8", "replace"))
+                else:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down
+            pass
+        finally:
+            self.clients.discard(client)
+            self._handlers.discard(handler)
+            writer.close()
+
+    def _request_placement(self, client: _Client, code: int, grid_x: int, grid_y: int):
+        if not 0 < code < len(self.city.type_names):
+            self._send(client, _frame(MSG_RESULT, bytes([RESULT_BLOCKED])))
+            return
+        building_type = self.city.type_names[code]
+        if not self.city._can_place_building(building_type, grid_x, grid_y):
+            self._send(client, _frame(MSG_RESULT, bytes([RESULT_BLOCKED])))
+            return
+        problem = self.problem_pool.pop(building_type)
+        client.pending = (building_type, grid_x, grid_y, problem)
+        self._send(client, _frame(MSG_PROBLEM, problem["question"].encode("utf-8")))
+
+    def _answer(self, client: _Client, answer: str):
+        if client.pending is None:
+            self._send(client, _frame(MSG_RESULT, bytes([RESULT_NO_PROBLEM])))
+            return
+        building_type, grid_x, grid_y, problem = client.pending
+        client.pending = None
+
+        # Only short plain numbers are accepted over the network: SymPy's
+        # parser evaluates its input, and huge numbers would stall the loop
+        number = self.math_solver.parse_number(answer)
+        correct = number is not None and self.math_solver.check_number(problem, number)
+
+        # Someone else may have built there while the problem was open
+        if not correct:
+            status = RESULT_WRONG
+        elif self.city.place_building(building_type, grid_x, grid_y):
+            status = RESULT_PLACED
+        else:
+            status = RESULT_BLOCKED
+        self._send(client, _frame(MSG_RESULT, bytes([status])))
+
+class GameClient:
+    def __init__(self, viewport: Tuple[int, int, int] = DEFAULT_VIEWPORT):
+        # Mirrors the server's city from the snapshot and deltas; replies to
+        # requests arrive in order on `replies`
+        self.viewport = viewport
+        self.city: Optional[City] = None
+        self.replies: "asyncio.Queue[Tuple[int, bytes]]" = asyncio.Queue()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self, host: str = "127.0.0.1", port: int = 8765):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        kind, payload = await _read_frame(self._reader)
+        if kind != MSG_SNAPSHOT:
+            raise ValueError(f"Expected a snapshot, got message {kind}")
+        grid_width, grid_height, count = SNAPSHOT.unpack_from(payload)
+        table = np.frombuffer(payload, dtype=BUILDING_DTYPE, count=count, offset=SNAPSHOT.size)
+        self.city = City(*self.viewport, grid_width, grid_height)
+        self.city.place_many([(self.city.type_names[code], x, y)
+                              for code, x, y in zip(table["type"].tolist(), table["x"].tolist(), table["y"].tolist())])
+        self._task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        self._writer.close()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                kind, payload = await _read_frame(self._reader)
+                if kind == MSG_DELTA:
+                    (count,) = COUNT.unpack_from(payload)
+                    for op, code, grid_x, grid_y in DELTA.iter_unpack(payload[COUNT.size:COUNT.size + count * DELTA.size]):
+                        apply_change(self.city, op, self.city.type_names[code], grid_x, grid_y)
+                else:
+                    self.replies.put_nowait((kind, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    async def request_placement(self, building_type: str, grid_x: int, grid_y: int) -> Optional[str]:
+        # The problem to solve for this placement, or None if it was refused
+        self._writer.write(_frame(MSG_PLACE, PLACE.pack(self.city.type_codes[building_type], grid_x, grid_y)))
+        kind, payload = await self.replies.get()
+        return payload.decode("utf-8") if kind == MSG_PROBLEM else None
+
+    async def answer(self, text: str) -> int:
+        self._writer.write(_frame(MSG_ANSWER, text.encode("utf-8")))
+        _, payload = await self.replies.get()
+        return payload[0]
+
+async def serve(host: str, port: int, grid_width: int, grid_height: int, tick_rate: int):
+    server = GameServer(City(*DEFAULT_VIEWPORT, grid_width, grid_height), MathSolver(), tick_rate)
+    await server.start(host, port)
+    print(f"Serving a {grid_width}x{grid_height} city on {host}:{server.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Host a shared city for networked players")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to listen on; use 0.0.0.0 to accept other machines")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--grid", default="120x80", help="grid size as WIDTHxHEIGHT")
+    parser.add_argument("--tick-rate", type=int, default=20, help="delta broadcasts per second")
+    args = parser.parse_args()
+    grid_width, grid_height = (int(value) for value in args.grid.lower().split("x"))
+    try:
+        asyncio.run(serve(args.host, args.port, grid_width, grid_height, args.tick_rate))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
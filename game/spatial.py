@@ -0,0 +1,121 @@
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Cells per bucket side. A building lives in the bucket holding its anchor
+# (top-left cell), so queries widen their bucket range up and left by the
+# largest building size to catch footprints that spill into the area
+BUCKET_SIZE = 16
+
+Bucket = Dict[int, Dict[str, Any]]
+
+def _distance(building: Dict[str, Any], grid_x: int, grid_y: int) -> float:
+    # Euclidean distance from a cell to the closest cell of a footprint
+    last = building["size"] - 1
+    dx = max(building["x"] - grid_x, 0, grid_x - building["x"] - last)
+    dy = max(building["y"] - grid_y, 0, grid_y - building["y"] - last)
+    return math.hypot(dx, dy)
+
+class SpatialIndex:
+    def __init__(self, grid_width: int, grid_height: int, max_size: int):
+        # Uniform bucket grid per building type: type -> (bx, by) -> id -> building
+        self.columns = -(-grid_width // BUCKET_SIZE)
+        self.rows = -(-grid_height // BUCKET_SIZE)
+        self.max_size = max_size
+        self._buckets: Dict[str, Dict[Tuple[int, int], Bucket]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def add(self, building: Dict[str, Any]):
+        key = (building["x"] // BUCKET_SIZE, building["y"] // BUCKET_SIZE)
+        buckets = self._buckets.setdefault(building["type"], {})
+        buckets.setdefault(key, {})[building["id"]] = building
+        self._counts[building["type"]] = self._counts.get(building["type"], 0) + 1
+
+    def remove(self, building: Dict[str, Any]):
+        key = (building["x"] // BUCKET_SIZE, building["y"] // BUCKET_SIZE)
+        buckets = self._buckets[building["type"]]
+        bucket = buckets[key]
+        del bucket[building["id"]]
+        if not bucket:
+            del buckets[key]
+        self._counts[building["type"]] -= 1
+
+    def _types(self, building_type: Optional[str]) -> Iterable[Dict[Tuple[int, int], Bucket]]:
+        if building_type is None:
+            return self._buckets.values()
+        buckets = self._buckets.get(building_type)
+        return [buckets] if buckets else []
+
+    def _candidates(self, x0: int, y0: int, x1: int, y1: int,
+                    building_type: Optional[str]) -> Iterator[Dict[str, Any]]:
+        # Buildings anchored in buckets that could overlap cells [x0, x1) x [y0, y1)
+        reach = self.max_size - 1
+        bx0 = max(0, (x0 - reach) // BUCKET_SIZE)
+        by0 = max(0, (y0 - reach) // BUCKET_SIZE)
+        bx1 = min(self.columns - 1, (x1 - 1) // BUCKET_SIZE)
+        by1 = min(self.rows - 1, (y1 - 1) // BUCKET_SIZE)
+        for buckets in self._types(building_type):
+            for by in range(by0, by1 + 1):
+                for bx in range(bx0, bx1 + 1):
+                    bucket = buckets.get((bx, by))
+                    if bucket:
+                        yield from bucket.values()
+
+    def in_rect(self, grid_x: int, grid_y: int, width: int, height: int,
+                building_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        x1 = grid_x + width
+        y1 = grid_y + height
+        return [
+            building for building in self._candidates(grid_x, grid_y, x1, y1, building_type)
+            if building["x"] < x1 and building["x"] + building["size"] > grid_x
+            and building["y"] < y1 and building["y"] + building["size"] > grid_y
+        ]
+
+    def in_radius(self, grid_x: int, grid_y: int, radius: float,
+                  building_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        reach = int(radius)
+        return [
+            building for building in self._candidates(grid_x - reach, grid_y - reach,
+                                                      grid_x + reach + 1, grid_y + reach + 1, building_type)
+            if _distance(building, grid_x, grid_y) <= radius
+        ]
+
+    def nearest(self, grid_x: int, grid_y: int, building_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # Search rings of buckets outward until no unvisited bucket can hold
+        # anything closer than the best match so far
+        if building_type is None:
+            if not any(self._counts.values()):
+                return None
+        elif not self._counts.get(building_type):
+            return None
+
+        center_x = min(max(grid_x, 0), self.columns * BUCKET_SIZE - 1) // BUCKET_SIZE
+        center_y = min(max(grid_y, 0), self.rows * BUCKET_SIZE - 1) // BUCKET_SIZE
+        best = None
+        best_distance = math.inf
+        for ring in range(max(self.columns, self.rows) + 1):
+            # Anything in this ring is at least this far away on one axis
+            if best is not None and best_distance <= (ring - 1) * BUCKET_SIZE - self.max_size + 1:
+                break
+            for buckets in self._types(building_type):
+                for key in self._ring(center_x, center_y, ring):
+                    for building in buckets.get(key, {}).values():
+                        distance = _distance(building, grid_x, grid_y)
+                        if distance < best_distance:
+                            best = building
+                            best_distance = distance
+        return best
+
+    def _ring(self, center_x: int, center_y: int, ring: int) -> Iterator[Tuple[int, int]]:
+        if ring == 0:
+            yield (center_x, center_y)
+            return
+        for bx in range(max(0, center_x - ring), min(self.columns, center_x + ring + 1)):
+            if center_y - ring >= 0:
+                yield (bx, center_y - ring)
+            if center_y + ring < self.rows:
+                yield (bx, center_y + ring)
+        for by in range(max(0, center_y - ring + 1), min(self.rows, center_y + ring)):
+            if center_x - ring >= 0:
+                yield (center_x - ring, by)
+            if center_x + ring < self.columns:
+                yield (center_x + ring, by)
@@ -0,0 +1,11 @@
+import pygame
+from typing import Tuple
+from .lru import LRUCache
+
+Sprite = Tuple[pygame.Surface, Tuple[int, int]]
+
+class SpriteCache(LRUCache):
+    def __init__(self, capacity: int = 16):
+        # Pre-rendered surfaces and their blit offsets; least recently used
+        # levels are evicted first, so zooming through them drops stale scales
+        super().__init__(capacity)
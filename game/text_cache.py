@@ -0,0 +1,10 @@
+import pygame
+from .lru import LRUCache
+
+class TextCache(LRUCache):
+    def __init__(self, capacity: int = 256):
+        # Rendered text surfaces keyed by (font, text, color, antialias)
+        super().__init__(capacity)
+
+    def render(self, font: pygame.font.Font, text: str, color, antialias: bool = True) -> pygame.Surface:
+        return self.get((font, text, tuple(color), antialias), lambda: font.render(text, antialias, color))
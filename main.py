@@ -1,18 +1,69 @@
-import pygame
 import sys
+import time
+
+# Cold-start timing, printed after the first frame with --startup-profile
+STARTUP_PROFILE = "--startup-profile" in sys.argv
+startup_marks = [("start", time.perf_counter())]
+
+def mark_startup(label):
+    startup_marks.append((label, time.perf_counter()))
+
+def report_startup():
+    print("Startup profile:")
+    for (_, previous), (label, now) in zip(startup_marks, startup_marks[1:]):
+        print(f"  {label:<20} {(now - previous) * 1000:8.1f} ms")
+    total = startup_marks[-1][1] - startup_marks[0][1]
+    print(f"  {'total':<20} {total * 1000:8.1f} ms")
+    print(f"  sympy loaded: {'sympy' in sys.modules}")
+
+def option_value(name):
+    # Value following a command-line option, e.g. --trace frames.csv
+    if name in sys.argv:
+        index = sys.argv.index(name) + 1
+        if index < len(sys.argv):
+            return sys.argv[index]
+    return None
+
+import pygame
+mark_startup("import pygame")
+from game.autosave import Autosave, recover_city, set_aside_damaged
 from game.engine import GameEngine
 from game.math_solver import MathSolver
-from game.city import City
+from game.city import DEFAULT_VIEWPORT, City
+from game.core import TICK_RATE
+from game.profiler import FrameProfiler
+from game.savefile import load_city, save_city
+from game.text_cache import TextCache
+mark_startup("import game")
 
 # Initialize Pygame
 pygame.init()
+mark_startup("pygame.init")
 
-# Constants
-WINDOW_WIDTH = 1424
-WINDOW_HEIGHT = 798
-GRID_SIZE = 40
+# Constants; the menu sits to the right of the city viewport
+CITY_WIDTH, WINDOW_HEIGHT, GRID_SIZE = DEFAULT_VIEWPORT
+MENU_WIDTH = 300
+WINDOW_WIDTH = CITY_WIDTH + MENU_WIDTH
 FPS = 60
 
+# With nothing on screen changing, the loop sleeps in pygame.event.wait for
+# up to this long; it stays under the simulation's catch-up cap
+# (MAX_FRAME_TIME) so economy ticks are never dropped
+IDLE_TIMEOUT_MS = 200
+
+# World size in cells; the camera pans/zooms over it
+WORLD_GRID_WIDTH = 120
+WORLD_GRID_HEIGHT = 80
+PAN_SPEED = 12
+
+# Quick-save file written with F5 and read back with F9
+SAVE_PATH = "city.sav"
+
+# Every placement is journaled here and restored on the next start
+AUTOSAVE_DIR = "autosave"
+# The coin balance changes every tick, so it is journaled this often instead
+COINS_AUTOSAVE_SECONDS = 5
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -25,6 +76,8 @@ MENU_BG = (45, 45, 45)
 BUTTON_HOVER = (60, 60, 60)
 TEXT_COLOR = (220, 220, 220)
 
+MENU_X = WINDOW_WIDTH - MENU_WIDTH
+
 class Game:
     def __init__(self):
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
@@ -32,14 +85,31 @@ class Game:
         self.clock = pygame.time.Clock()
         
         # Initialize game components
-        self.city = City(WINDOW_WIDTH - 300, WINDOW_HEIGHT, GRID_SIZE)  # Increased menu width
+        damaged_backup = None
+        if "--new-city" in sys.argv:
+            self.city = City(*DEFAULT_VIEWPORT, WORLD_GRID_WIDTH, WORLD_GRID_HEIGHT)
+        else:
+            try:
+                self.city = recover_city(AUTOSAVE_DIR, *DEFAULT_VIEWPORT,
+                                         WORLD_GRID_WIDTH, WORLD_GRID_HEIGHT)
+            except ValueError:
+                # Start a new city rather than refuse to start, keeping the
+                # damaged files out of the new autosave's way
+                damaged_backup = set_aside_damaged(AUTOSAVE_DIR)
+                self.city = City(*DEFAULT_VIEWPORT, WORLD_GRID_WIDTH, WORLD_GRID_HEIGHT)
+        self.autosave = Autosave(self.city, AUTOSAVE_DIR)
+        self.coins_saved_at = time.perf_counter()
         self.math_solver = MathSolver()
         self.engine = GameEngine(self.city, self.math_solver)
+        if damaged_backup is not None:
+            self.engine.show_message(f"Autosave was damaged; moved to {damaged_backup}",
+                                     duration=5 * TICK_RATE)
         
         # UI elements
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
         self.title_font = pygame.font.Font(None, 48)
+        self.text_cache = TextCache()
         
         # Building selection menu
         self.building_buttons = [
@@ -49,7 +119,7 @@ class Game:
                 "size": 1,
                 "rect": pygame.Rect(WINDOW_WIDTH - 280, 120, 240, 60),
                 "description": "Basic residential building",
-                "cost": "100 coins"
+                "cost": f"{self.city.building_types['house']['cost']} coins"
             },
             {
                 "name": "Shop",
@@ -57,7 +127,7 @@ class Game:
                 "size": 2,
                 "rect": pygame.Rect(WINDOW_WIDTH - 280, 200, 240, 60),
                 "description": "Commercial building",
-                "cost": "250 coins"
+                "cost": f"{self.city.building_types['shop']['cost']} coins"
             },
             {
                 "name": "Factory",
@@ -65,7 +135,7 @@ class Game:
                 "size": 3,
                 "rect": pygame.Rect(WINDOW_WIDTH - 280, 280, 240, 60),
                 "description": "Industrial complex",
-                "cost": "500 coins"
+                "cost": f"{self.city.building_types['factory']['cost']} coins"
             },
             {
                 "name": "Park",
@@ -73,7 +143,7 @@ class Game:
                 "size": 2,
                 "rect": pygame.Rect(WINDOW_WIDTH - 280, 360, 240, 60),
                 "description": "Recreational space",
-                "cost": "150 coins"
+                "cost": f"{self.city.building_types['park']['cost']} coins"
             }
         ]
         
@@ -81,29 +151,65 @@ class Game:
         self.show_instructions = True
         self.hovered_button = None
 
+        # Pre-composited menu panel, rebuilt only when its state changes
+        self.menu_panel = pygame.Surface((MENU_WIDTH, WINDOW_HEIGHT))
+        self.menu_state = None
+
+        # Set when something on screen may have changed; otherwise the frame
+        # is skipped (see run)
+        self.needs_redraw = True
+
+        # Frame-time instrumentation: --profile shows the overlay (F3 toggles),
+        # --trace PATH also writes per-section timings as CSV or JSON on exit
+        self.trace_path = option_value("--trace")
+        self.profiler = FrameProfiler(enabled="--profile" in sys.argv or self.trace_path is not None)
+
+    def current_menu_state(self):
+        economy = self.engine.economy.report(self.city)
+        return (self.hovered_button, self.selected_building, self.show_instructions,
+                int(self.engine.coins), int(economy["total_population"]), round(economy["total_income"], 1))
+
     def draw_menu(self):
+        state = self.current_menu_state()
+        if state != self.menu_state:
+            self.render_menu(self.menu_panel)
+            self.menu_state = state
+        self.screen.blit(self.menu_panel, (MENU_X, 0))
+
+    def render_menu(self, panel):
         # Draw menu background
-        pygame.draw.rect(self.screen, MENU_BG, (WINDOW_WIDTH - 300, 0, 300, WINDOW_HEIGHT))
+        panel.fill(MENU_BG)
         
         # Draw title
-        title = self.title_font.render("Math City Builder", True, TEXT_COLOR)
-        self.screen.blit(title, (WINDOW_WIDTH - 280, 20))
+        title = self.text_cache.render(self.title_font, "Math City Builder", TEXT_COLOR)
+        panel.blit(title, (20, 20))
+
+        # Draw the treasury and population
+        economy = self.engine.economy.report(self.city)
+        coins = self.text_cache.render(
+            self.small_font, f"Coins: {int(self.engine.coins)} ({economy['total_income']:+.1f}/s)", TEXT_COLOR)
+        population = self.text_cache.render(
+            self.small_font, f"Population: {int(economy['total_population'])}", TEXT_COLOR)
+        panel.blit(coins, (20, 70))
+        panel.blit(population, (20, 92))
         
         # Draw building buttons
         for button in self.building_buttons:
+            rect = button["rect"].move(-MENU_X, 0)
+
             # Draw button background
             color = BUTTON_HOVER if self.hovered_button == button["name"] else button["color"]
-            pygame.draw.rect(self.screen, color, button["rect"])
-            pygame.draw.rect(self.screen, TEXT_COLOR, button["rect"], 2)
+            pygame.draw.rect(panel, color, rect)
+            pygame.draw.rect(panel, TEXT_COLOR, rect, 2)
             
             # Draw button text
-            name_text = self.font.render(button["name"], True, TEXT_COLOR)
-            desc_text = self.small_font.render(button["description"], True, TEXT_COLOR)
-            cost_text = self.small_font.render(button["cost"], True, TEXT_COLOR)
+            name_text = self.text_cache.render(self.font, button["name"], TEXT_COLOR)
+            desc_text = self.text_cache.render(self.small_font, button["description"], TEXT_COLOR)
+            cost_text = self.text_cache.render(self.small_font, button["cost"], TEXT_COLOR)
             
-            self.screen.blit(name_text, (button["rect"].x + 10, button["rect"].y + 5))
-            self.screen.blit(desc_text, (button["rect"].x + 10, button["rect"].y + 30))
-            self.screen.blit(cost_text, (button["rect"].x + 10, button["rect"].y + 45))
+            panel.blit(name_text, (rect.x + 10, rect.y + 5))
+            panel.blit(desc_text, (rect.x + 10, rect.y + 30))
+            panel.blit(cost_text, (rect.x + 10, rect.y + 45))
         
         # Draw instructions
         if self.show_instructions:
@@ -115,7 +221,10 @@ class Game:
                 "4. Press Enter to submit answer",
                 "",
                 "Controls:",
+                "Arrows / Right-drag - Pan",
+                "Mouse wheel - Zoom",
                 "H - Toggle instructions",
+                "F3 - Toggle frame profiler",
                 "ESC - Cancel placement",
                 "Enter - Submit answer",
                 "Backspace - Delete input",
@@ -123,15 +232,104 @@ class Game:
                 "Press H to hide instructions"
             ]
             
-            y = 450
+            y = 440
             for line in instructions:
-                text = self.small_font.render(line, True, TEXT_COLOR)
-                self.screen.blit(text, (WINDOW_WIDTH - 280, y))
-                y += 25
+                text = self.text_cache.render(self.small_font, line, TEXT_COLOR)
+                panel.blit(text, (20, y))
+                y += 22
+
+    def load_city(self, path):
+        try:
+            city = load_city(path, *DEFAULT_VIEWPORT)
+        except OSError:
+            self.engine.show_message("No saved city to load!")
+            return
+        except ValueError:
+            self.engine.show_message("Saved city is damaged!")
+            return
+        self.city = city
+        self.engine.city = city
+        self.autosave.attach(city)
+        self.engine.cancel()
+        self.selected_building = None
+        self.engine.show_message("City loaded!")
+
+    def is_animating(self) -> bool:
+        # Whether the screen changes without any input event arriving
+        keys = pygame.key.get_pressed()
+        panning = not self.engine.showing_problem and (
+            keys[pygame.K_LEFT] or keys[pygame.K_RIGHT] or keys[pygame.K_UP] or keys[pygame.K_DOWN])
+        return self.profiler.enabled or self.engine.message_timer > 0 or panning
+
+    def wait_for_events(self):
+        # Pending events, blocking for up to IDLE_TIMEOUT_MS when there are
+        # none and nothing is animating
+        events = pygame.event.get()
+        if not events and not self.needs_redraw and not self.is_animating():
+            event = pygame.event.wait(IDLE_TIMEOUT_MS)
+            if event.type != pygame.NOEVENT:
+                events = [event] + pygame.event.get()
+        return events
+
+    def handle_events(self, mouse_pos, events) -> bool:
+        # Returns False once the window is closed
+        running = True
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # Left click
+                    if mouse_pos[0] > WINDOW_WIDTH - 300:
+                        for button in self.building_buttons:
+                            if button["rect"].collidepoint(mouse_pos):
+                                self.selected_building = button["name"].lower()
+                                self.engine.select_building(self.selected_building)
+                    else:
+                        self.engine.handle_click(mouse_pos)
+            elif event.type == pygame.MOUSEWHEEL:
+                if mouse_pos[0] <= WINDOW_WIDTH - 300:
+                    self.city.camera.zoom_by(event.y, mouse_pos)
+            elif event.type == pygame.MOUSEMOTION:
+                if event.buttons[2]:  # Right-drag pans
+                    self.city.camera.pan(-event.rel[0], -event.rel[1])
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_h:
+                    self.show_instructions = not self.show_instructions
+                elif event.key == pygame.K_F3:
+                    self.profiler.enabled = not self.profiler.enabled
+                elif event.key == pygame.K_F5:
+                    save_city(self.city, SAVE_PATH)
+                    self.engine.show_message("City saved!")
+                elif event.key == pygame.K_F9:
+                    self.load_city(SAVE_PATH)
+                elif event.key == pygame.K_ESCAPE:
+                    self.selected_building = None
+                    self.engine.cancel()
+                elif self.engine.showing_problem:
+                    if event.key == pygame.K_RETURN:
+                        self.engine.handle_enter()
+                    elif event.key == pygame.K_BACKSPACE:
+                        self.engine.backspace()
+                    else:
+                        self.engine.type_text(event.unicode)
+
+        # Pan with the arrow keys unless typing an answer
+        if not self.engine.showing_problem:
+            keys = pygame.key.get_pressed()
+            dx = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * PAN_SPEED
+            dy = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * PAN_SPEED
+            if dx or dy:
+                self.city.camera.pan(dx, dy)
+                self.needs_redraw = True
+        return running
 
     def run(self):
         running = True
+        profiler = self.profiler
+        menu_rect = pygame.Rect(MENU_X, 0, MENU_WIDTH, WINDOW_HEIGHT)
         while running:
+            events = self.wait_for_events()
+            profiler.begin_frame()
             mouse_pos = pygame.mouse.get_pos()
             
             # Update hover state
@@ -141,50 +339,56 @@ class Game:
                     if button["rect"].collidepoint(mouse_pos):
                         self.hovered_button = button["name"]
             
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Left click
-                        if mouse_pos[0] > WINDOW_WIDTH - 300:
-                            for button in self.building_buttons:
-                                if button["rect"].collidepoint(mouse_pos):
-                                    self.selected_building = button["name"].lower()
-                                    self.engine.selected_building = self.selected_building
-                        else:
-                            self.engine.handle_click(mouse_pos)
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_h:
-                        self.show_instructions = not self.show_instructions
-                    elif event.key == pygame.K_ESCAPE:
-                        self.selected_building = None
-                        self.engine.selected_building = None
-                        self.engine.showing_problem = False
-                        self.engine.current_problem = None
-                        self.engine.user_input = ""
-                    elif self.engine.showing_problem:
-                        if event.key == pygame.K_RETURN:
-                            self.engine.handle_enter()
-                        elif event.key == pygame.K_BACKSPACE:
-                            self.engine.user_input = self.engine.user_input[:-1]
-                        else:
-                            self.engine.user_input += event.unicode
-
-            # Update game state
-            self.engine.update()
-
-            # Draw everything
-            self.screen.fill(WHITE)
-            self.engine.draw(self.screen)
-            self.draw_menu()
-            pygame.display.flip()
+            with profiler.section("events"):
+                running = self.handle_events(mouse_pos, events)
+            for error in self.autosave.take_errors():
+                self.engine.show_message(f"Autosave failed: {error.strerror or error}")
+
+            # Update game state; a message also needs the frame it disappears on
+            message_shown = self.engine.message_timer > 0
+            with profiler.section("update"):
+                self.engine.update(self.clock.get_time() / 1000)
+            if time.perf_counter() - self.coins_saved_at >= COINS_AUTOSAVE_SECONDS:
+                self.autosave.save_coins()
+                self.coins_saved_at = time.perf_counter()
+
+            if events or message_shown or self.is_animating():
+                self.needs_redraw = True
+
+            # Draw everything, or just the menu if only the coins changed
+            if self.needs_redraw:
+                with profiler.section("city"):
+                    self.screen.fill(WHITE)
+                    self.city.draw(self.screen)
+                with profiler.section("overlays"):
+                    self.engine.draw_overlays(self.screen)
+                with profiler.section("menu"):
+                    self.draw_menu()
+                profiler.draw_overlay(self.screen, self.small_font)
+                with profiler.section("flip"):
+                    pygame.display.flip()
+                self.needs_redraw = False
+            elif self.current_menu_state() != self.menu_state:
+                with profiler.section("menu"):
+                    self.draw_menu()
+                with profiler.section("flip"):
+                    pygame.display.update(menu_rect)
+            profiler.end_frame()
+            if STARTUP_PROFILE and startup_marks[-1][0] != "first frame":
+                mark_startup("first frame")
+                report_startup()
 
             # Cap the frame rate
             self.clock.tick(FPS)
 
+        if self.trace_path:
+            profiler.export(self.trace_path)
+        self.autosave.save_coins()
+        self.autosave.close()
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
     game = Game()
+    mark_startup("Game init")
     game.run() 
\ No newline at end of file
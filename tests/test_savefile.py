@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from game.city import DEFAULT_VIEWPORT, City
+from game.savefile import BUILDING_DTYPE, load_city, save_city
+
+def make_city() -> City:
+    city = City(*DEFAULT_VIEWPORT, 30, 20)
+    city.place_many([("house", 0, 0), ("shop", 2, 0), ("factory", 5, 5), ("park", 10, 12)])
+    city.coins = 321.5
+    return city
+
+@pytest.fixture
+def save_path(tmp_path):
+    path = str(tmp_path / "city.sav")
+    save_city(make_city(), path)
+    return path
+
+def load(path):
+    return load_city(path, *DEFAULT_VIEWPORT)
+
+def rewrite_table(path, field, index, value):
+    data = bytearray(open(path, "rb").read())
+    city = load(path)
+    offset = len(data) - len(city.buildings) * BUILDING_DTYPE.itemsize
+    table = np.frombuffer(bytes(data[offset:]), dtype=BUILDING_DTYPE).copy()
+    table[field][index] = value
+    data[offset:] = table.tobytes()
+    open(path, "wb").write(data)
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_round_trip(save_path, use_mmap):
+    original = make_city()
+    city = load_city(save_path, *DEFAULT_VIEWPORT, use_mmap=use_mmap)
+    assert city.buildings == original.buildings
+    assert np.array_equal(city.type_grid, original.type_grid)
+    assert np.array_equal(city.id_grid, original.id_grid)
+    assert city.coins == original.coins
+    assert city.place_building("house", 20, 15)
+    assert max(city.buildings) == max(original.buildings) + 1
+
+def test_truncated_files_raise_value_error(save_path):
+    data = open(save_path, "rb").read()
+    for length in (0, 3, 10, 30, 40, len(data) // 2, len(data) - 1):
+        open(save_path, "wb").write(data[:length])
+        with pytest.raises(ValueError):
+            load(save_path)
+
+def test_trailing_data_raises_value_error(save_path):
+    with open(save_path, "ab") as f:
+        f.write(b"\0")
+    with pytest.raises(ValueError):
+        load(save_path)
+
+def test_bad_magic_and_version_raise_value_error(save_path):
+    data = bytearray(open(save_path, "rb").read())
+    open(save_path, "wb").write(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        load(save_path)
+    data[4] = 99
+    open(save_path, "wb").write(data)
+    with pytest.raises(ValueError):
+        load(save_path)
+
+def test_unknown_grid_id_raises_value_error(save_path):
+    city = load(save_path)
+    data = bytearray(open(save_path, "rb").read())
+    # The last id cell is the bottom-right corner, which is empty
+    id_end = len(data) - len(city.buildings) * BUILDING_DTYPE.itemsize
+    data[id_end - 4:id_end] = (77).to_bytes(4, "little")
+    open(save_path, "wb").write(data)
+    with pytest.raises(ValueError):
+        load(save_path)
+
+@pytest.mark.parametrize("field, value", [
+    ("id", 2),        # duplicate id
+    ("id", 0),        # ids start at 1
+    ("x", -1),        # outside the grid
+    ("y", 19),        # footprint runs off the bottom edge
+    ("size", 3),      # wrong size for its type
+    ("type", 9)       # unknown type code
+])
+def test_corrupt_table_raises_value_error(save_path, field, value):
+    rewrite_table(save_path, field, 0, value)
+    with pytest.raises(ValueError):
+        load(save_path)
+
+def test_stale_next_building_id_raises_value_error(save_path):
+    data = bytearray(open(save_path, "rb").read())
+    # u32 next building id follows magic, version, width, height and count
+    data[18:22] = (2).to_bytes(4, "little")
+    open(save_path, "wb").write(data)
+    with pytest.raises(ValueError):
+        load(save_path)